@@ -1,60 +1,206 @@
-from openai import OpenAI
+import asyncio
+import hashlib
+import json
 import os
+import weakref
+from app import llm_client
+from app.cache import TieredCache
 from app.feedback_engine import derive_facts
+from app.single_flight import SingleFlight
 
-def generate_summary(repo: dict, code: dict, commits: dict) -> str:
-    """
-    Generates a recruiter-style summary by asking AI to explain the derived facts.
-    Facts -> Narrative.
-    """
-    facts = derive_facts(code, commits, repo)
-    strengths = facts["strengths"]
-    weaknesses = facts["weaknesses"]
-    
-    api_key = os.getenv("OPENAI_API_KEY")
-    
+SUMMARY_MODEL = "gpt-4o"
+# Bump whenever _build_prompt changes so cached narratives from the old prompt aren't reused.
+PROMPT_VERSION = 1
+
+# The prompt only depends on the derived strengths/weaknesses, a small set of
+# combinations, so identical fact profiles reuse the narrative instead of paying
+# for another completion.
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", str(30 * 24 * 3600)))
+SUMMARY_CACHE_DISK_ITEMS = int(os.getenv("SUMMARY_CACHE_DISK_ITEMS", "2000"))
+
+_summary_cache = TieredCache(
+    "llm_summaries",
+    ttl=SUMMARY_CACHE_TTL,
+    memory_items=256,
+    disk_items=SUMMARY_CACHE_DISK_ITEMS,
+)
+# Concurrent analyses with the same fact profile share one completion
+_completions_in_flight = SingleFlight()
+
+# Summaries requested within this many seconds of each other go out as one
+# combined completion (0 = one request per summary), up to LLM_BATCH_MAX per request.
+LLM_BATCH_WINDOW = float(os.getenv("LLM_BATCH_WINDOW", "0.05"))
+LLM_BATCH_MAX = int(os.getenv("LLM_BATCH_MAX", "8"))
+
+def _mirror_summary(strengths: list, weaknesses: list) -> str:
+    # Deterministic Mirror (Fallback)
+    # We manually construct sentences from the first few facts
+    summary = "Analysis Results: "
+    if strengths:
+        summary += f"The repository demonstrates {strengths[0].lower()} and {strengths[1].lower() if len(strengths)>1 else 'good fundamentals'}. "
+
+    if weaknesses:
+        summary += f"However, {weaknesses[0].lower()} and {weaknesses[1].lower() if len(weaknesses)>1 else 'improvements are needed'}. "
+    elif strengths:
+        summary += "It shows strong engineering maturity overall."
+
+    return summary.strip()
+
+def _error_summary(strengths: list, weaknesses: list) -> str:
+    return f"The project shows {len(strengths)} strengths (e.g., {strengths[0] if strengths else 'N/A'}) but has {len(weaknesses)} areas for improvement ({weaknesses[0] if weaknesses else 'N/A'})."
+
+def _build_prompt(strengths: list, weaknesses: list) -> str:
     # Construction of the prompt context
     strength_text = "\n".join([f"- {s}" for s in strengths]) if strengths else "- None identified"
     weakness_text = "\n".join([f"- {w}" for w in weaknesses]) if weaknesses else "- None identified"
 
-    if not api_key:
-        # Deterministic Mirror (Fallback)
-        # We manually construct sentences from the first few facts
-        summary = "Analysis Results: "
-        if strengths:
-            summary += f"The repository demonstrates {strengths[0].lower()} and {strengths[1].lower() if len(strengths)>1 else 'good fundamentals'}. "
-        
-        if weaknesses:
-            summary += f"However, {weaknesses[0].lower()} and {weaknesses[1].lower() if len(weaknesses)>1 else 'improvements are needed'}. "
-        elif strengths:
-            summary += "It shows strong engineering maturity overall."
-            
-        return summary.strip()
-
-    client = OpenAI(api_key=api_key)
-    
-    prompt = f"""
-    You are a generic Repository Mirror. 
+    return f"""
+    You are a generic Repository Mirror.
     Review these FACTS about a GitHub repository and write a 2-sentence professional recruiter evaluation.
-    
+
     STRENGTHS:
     {strength_text}
-    
+
     WEAKNESSES:
     {weakness_text}
-    
+
     TASK:
-    Convert these bullet points into a cohesive, professional narrative. 
+    Convert these bullet points into a cohesive, professional narrative.
     Do NOT invent new attributes. Reflect ONLY these facts.
     Balance the tone: verify quality but be honest about gaps.
     """
 
+def _build_batch_prompt(profiles: list) -> str:
+    sections = []
+    for number, (strengths, weaknesses) in enumerate(profiles, 1):
+        strength_text = "\n".join([f"- {s}" for s in strengths]) if strengths else "- None identified"
+        weakness_text = "\n".join([f"- {w}" for w in weaknesses]) if weaknesses else "- None identified"
+        sections.append(f"### Repository {number}\nSTRENGTHS:\n{strength_text}\nWEAKNESSES:\n{weakness_text}")
+    facts = "\n\n".join(sections)
+
+    return f"""
+    You are a generic Repository Mirror.
+    Review the FACTS about each of these {len(profiles)} GitHub repositories and write a 2-sentence professional recruiter evaluation for each one.
+
+{facts}
+
+    TASK:
+    Convert each repository's bullet points into a cohesive, professional narrative.
+    Do NOT invent new attributes. Reflect ONLY that repository's facts.
+    Balance the tone: verify quality but be honest about gaps.
+    Answer with a JSON object {{"summaries": [...]}} holding exactly {len(profiles)} strings, in repository order.
+    """
+
+def _parse_batch(raw: str, count: int) -> list:
+    summaries = json.loads(raw)["summaries"]
+    if len(summaries) != count or not all(isinstance(s, str) and s.strip() for s in summaries):
+        raise ValueError(f"Expected {count} summaries in the batched completion")
+    return [s.strip() for s in summaries]
+
+def summary_cache_key(strengths: list, weaknesses: list) -> str:
+    """
+    Key for the fact profile: order- and case-insensitive, plus model and prompt version.
+    """
+    profile = {
+        "model": SUMMARY_MODEL,
+        "prompt": PROMPT_VERSION,
+        "strengths": sorted(s.strip().lower() for s in strengths),
+        "weaknesses": sorted(w.strip().lower() for w in weaknesses),
+    }
+    return hashlib.sha256(json.dumps(profile, sort_keys=True).encode()).hexdigest()
+
+async def generate_summary_async(repo: dict, code: dict, commits: dict) -> str:
+    """
+    Generates a recruiter-style summary by asking AI to explain the facts
+    derived from the metrics (Facts -> Narrative): from the cache when the
+    same fact profile was summarized before, otherwise from the LLM.
+    Summaries requested together are batched into one completion, and past
+    LLM_TIMEOUT the deterministic summary is returned instead.
+    """
+    facts = derive_facts(code, commits, repo)
+    strengths = facts["strengths"]
+    weaknesses = facts["weaknesses"]
+
+    if not llm_client.is_configured():
+        return _mirror_summary(strengths, weaknesses)
+
+    key = summary_cache_key(strengths, weaknesses)
+    cached = await _summary_cache.get_async(key)
+    if cached:
+        return cached
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=150
+        return await asyncio.wait_for(
+            _completions_in_flight.run(key, lambda: _batcher().submit(strengths, weaknesses)),
+            llm_client.LLM_TIMEOUT,
         )
-        return response.choices[0].message.content.strip()
+    except asyncio.TimeoutError:
+        # The completion keeps running and still lands in the cache for the next analysis
+        print(f"LLM summary missed its {llm_client.LLM_TIMEOUT}s deadline, using the deterministic summary")
+        return _mirror_summary(strengths, weaknesses)
     except Exception as e:
-        return f"The project shows {len(strengths)} strengths (e.g., {strengths[0] if strengths else 'N/A'}) but has {len(weaknesses)} areas for improvement ({weaknesses[0] if weaknesses else 'N/A'})."
+        return _error_summary(strengths, weaknesses)
+
+class _SummaryBatcher:
+    """
+    Collects the summaries requested on one event loop during LLM_BATCH_WINDOW
+    and sends them as a single completion. A lone request uses the normal prompt.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.timer = None
+        self.sending = set()
+
+    def submit(self, strengths: list, weaknesses: list) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((strengths, weaknesses, future))
+        if LLM_BATCH_WINDOW <= 0 or len(self.pending) >= LLM_BATCH_MAX:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(LLM_BATCH_WINDOW, self.flush)
+        return future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self.sending.add(task)
+            task.add_done_callback(self.sending.discard)
+
+    async def _send(self, batch: list):
+        try:
+            if len(batch) == 1:
+                strengths, weaknesses, _ = batch[0]
+                summaries = [await llm_client.chat(_build_prompt(strengths, weaknesses), SUMMARY_MODEL, 150)]
+            else:
+                print(f"DEBUG: Sending {len(batch)} summaries as one completion")
+                raw = await llm_client.chat(
+                    _build_batch_prompt([(s, w) for s, w, _ in batch]),
+                    SUMMARY_MODEL,
+                    150 * len(batch),
+                    response_format={"type": "json_object"},
+                )
+                summaries = _parse_batch(raw, len(batch))
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (strengths, weaknesses, future), summary in zip(batch, summaries):
+            await _summary_cache.put_async(summary_cache_key(strengths, weaknesses), summary)
+            if not future.done():
+                future.set_result(summary)
+
+_batchers = weakref.WeakKeyDictionary()
+
+def _batcher() -> _SummaryBatcher:
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = _batchers[loop] = _SummaryBatcher()
+    return batcher
@@ -0,0 +1,310 @@
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from app import metrics
+
+# Directory for on-disk caches; relative paths resolve against the working dir (like pdfs/).
+CACHE_DIR = os.getenv("GITGRADE_CACHE_DIR", ".cache")
+# Disk-tier reads are recorded in memory and written with the next put (or
+# once this many have piled up), so a read never commits.
+ACCESS_FLUSH_EVERY = 1000
+
+class TieredCache:
+    """
+    A small key/value cache with TTL and LRU eviction: an in-memory tier in front
+    of an SQLite table that survives restarts. Values are JSON documents, or raw
+    bytes when codec="bytes". Thread-safe; every operation is a single indexed query.
+    Values handed out by the memory tier are shared, so treat them as read-only.
+    The memory tier holds at most memory_items entries and, when `weigh` (value ->
+    size in bytes) is given, at most memory_bytes; larger values stay on disk only.
+    Async code uses get_async/put_async, which keep SQLite off the event loop.
+    The disk tier fails open: when SQLite or the directory is unusable (read-only
+    filesystem, a lock held past the timeout) lookups miss and writes are dropped,
+    and the cache carries on from memory.
+    """
+
+    def __init__(self, name: str, ttl: float, memory_items: int = 256, disk_items: int = 5000,
+                 codec: str = "json", path: str = None, memory_bytes: int = None, weigh=None):
+        self.name = name
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.memory_bytes = memory_bytes
+        self.weigh = weigh
+        self.disk_items = disk_items
+        self.codec = codec
+        self.path = path or os.path.join(CACHE_DIR, "gitgrade.sqlite3")
+        # key -> (stored_at, value, size)
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        # key -> last disk-tier read not yet written to accessed_at
+        self._accessed = {}
+        # Rows on disk, as far as this process knows (None until counted)
+        self._rows = None
+        self._lock = threading.Lock()
+        self._db = None
+        # Set when the database can't be opened; the cache is memory-only from then on
+        self._disk_failed = False
+        self._warned = False
+
+    def _conn(self):
+        # Opened lazily so importing a module that declares a cache never touches the disk
+        if self._db is None and self._has_disk():
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+                db.execute("PRAGMA journal_mode=WAL")
+                # A cache can lose its last writes on power loss; it can skip the fsync per commit
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.name} ("
+                    "key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                db.execute(f"CREATE INDEX IF NOT EXISTS {self.name}_accessed ON {self.name} (accessed_at)")
+                db.commit()
+                self._db = db
+            except (OSError, sqlite3.Error) as e:
+                self._disk_failed = True
+                self._disk_error(e)
+        return self._db
+
+    def _has_disk(self) -> bool:
+        return self.disk_items > 0 and not self._disk_failed
+
+    def _disk_error(self, e):
+        # Logged once per cache; later failures are just misses / dropped writes
+        if not self._warned:
+            self._warned = True
+            print(f"Cache {self.name}: disk tier unavailable ({e}), using memory only", file=sys.stderr, flush=True)
+
+    def _encode(self, value):
+        return value if self.codec == "bytes" else json.dumps(value)
+
+    def _decode(self, raw):
+        return bytes(raw) if self.codec == "bytes" else json.loads(raw)
+
+    def get(self, key: str):
+        """
+        Returns the cached value or None when missing or expired.
+        """
+        value = self._lookup(key)
+        metrics.cache_lookups.inc(self.name, "miss" if value is None else "hit")
+        return value
+
+    async def get_async(self, key: str):
+        """
+        get() for async code: a memory-tier hit is answered right away, the
+        disk tier is read on a worker thread.
+        """
+        with self._lock:
+            value = self._from_memory(key, time.time())
+        if value is None and self._has_disk():
+            return await asyncio.to_thread(self.get, key)
+        metrics.cache_lookups.inc(self.name, "miss" if value is None else "hit")
+        return value
+
+    def peek(self, key: str):
+        """
+        The memory-tier value only: never reads the disk or counts a lookup.
+        """
+        with self._lock:
+            return self._from_memory(key, time.time())
+
+    def _from_memory(self, key: str, now: float):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        stored_at, value, _ = entry
+        if now - stored_at < self.ttl:
+            self._memory.move_to_end(key)
+            return value
+        self._forget(key)
+        return None
+
+    def _lookup(self, key: str):
+        now = time.time()
+        with self._lock:
+            value = self._from_memory(key, now)
+            if value is not None:
+                return value
+
+            db = self._conn()
+            if db is None:
+                return None
+            try:
+                row = db.execute(f"SELECT value, stored_at FROM {self.name} WHERE key = ?", (key,)).fetchone()
+                # Expired rows are left for the next put of the key (or LRU eviction) to replace
+                if row is None or now - row[1] >= self.ttl:
+                    return None
+                raw, stored_at = row
+                self._touch([key], now)
+            except sqlite3.Error as e:
+                self._disk_error(e)
+                return None
+            value = self._decode(raw)
+            self._remember(key, stored_at, value)
+            return value
+
+    def get_many(self, keys) -> dict:
+        """
+        Bulk get: returns {key: value} for the keys that are cached and fresh,
+        reading the disk tier in a few IN (...) queries instead of one per key.
+        """
+        keys = list(keys)
+        found = self._lookup_many(keys)
+        metrics.cache_lookups.inc(self.name, "hit", amount=len(found))
+        metrics.cache_lookups.inc(self.name, "miss", amount=len(keys) - len(found))
+        return found
+
+    def _lookup_many(self, keys) -> dict:
+        now = time.time()
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                entry = self._memory.get(key)
+                if entry is not None and now - entry[0] < self.ttl:
+                    self._memory.move_to_end(key)
+                    found[key] = entry[1]
+                else:
+                    missing.append(key)
+
+            db = self._conn()
+            if db is None or not missing:
+                return found
+            try:
+                for i in range(0, len(missing), 500):
+                    chunk = missing[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = db.execute(
+                        f"SELECT key, value, stored_at FROM {self.name} WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, raw, stored_at in rows:
+                        if now - stored_at >= self.ttl:
+                            continue
+                        value = self._decode(raw)
+                        self._remember(key, stored_at, value)
+                        found[key] = value
+                self._touch([key for key in missing if key in found], now)
+            except sqlite3.Error as e:
+                self._disk_error(e)
+            return found
+
+    def _touch(self, keys, now: float):
+        # LRU bookkeeping for disk-tier reads, written in bulk later (lock held)
+        for key in keys:
+            self._accessed[key] = now
+        if len(self._accessed) >= ACCESS_FLUSH_EVERY:
+            self._flush_accessed(self._db)
+            self._db.commit()
+
+    def _flush_accessed(self, db):
+        if self._accessed:
+            db.executemany(
+                f"UPDATE {self.name} SET accessed_at = ? WHERE key = ?",
+                [(at, key) for key, at in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def put(self, key: str, value):
+        self.put_many({key: value})
+
+    async def put_async(self, key: str, value):
+        """
+        put() for async code: the memory tier is updated right away, the disk
+        write (encoding, commit, eviction) runs on a worker thread.
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+        if self._has_disk():
+            await asyncio.to_thread(self._write, {key: value}, now)
+
+    def put_many(self, items: dict):
+        """
+        Stores several entries in one transaction.
+        """
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, now, value)
+        self._write(items, now)
+
+    def _write(self, items: dict, now: float):
+        with self._lock:
+            db = self._conn()
+            if db is None:
+                return
+            try:
+                self._insert(db, items, now)
+            except sqlite3.Error as e:
+                self._disk_error(e)
+                # Recounted by the next write
+                self._rows = None
+                try:
+                    db.rollback()
+                except sqlite3.Error:
+                    pass
+
+    def _insert(self, db, items: dict, now: float):
+        # One transaction: pending access times, the rows, then eviction (lock held)
+        self._flush_accessed(db)
+        if self._rows is None:
+            self._rows = db.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+        db.executemany(
+            f"INSERT OR REPLACE INTO {self.name} (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+            [(key, self._encode(value), now, now) for key, value in items.items()],
+        )
+        # Replacements are counted as new rows too, which only brings eviction forward
+        self._rows += len(items)
+        if self._rows > self.disk_items:
+            # LRU eviction on disk: drop the least recently read rows down to 90% of
+            # the cap, so the scan runs once per disk_items / 10 new rows, not per put
+            keep = max(1, self.disk_items * 9 // 10)
+            db.execute(
+                f"DELETE FROM {self.name} WHERE key IN (SELECT key FROM {self.name} "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (keep,),
+            )
+            self._rows = min(self._rows, keep)
+        db.commit()
+
+    def _remember(self, key, stored_at, value):
+        if self.memory_items <= 0:
+            return
+        self._forget(key)
+        size = self.weigh(value) if self.weigh else 0
+        if self.memory_bytes is not None and size > self.memory_bytes:
+            return
+        self._memory[key] = (stored_at, value, size)
+        self._memory_size += size
+        while len(self._memory) > self.memory_items or (
+                self.memory_bytes is not None and self._memory_size > self.memory_bytes):
+            self._memory_size -= self._memory.popitem(last=False)[1][2]
+
+    def _forget(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_size -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            self._accessed.clear()
+            db = self._conn()
+            if db is None:
+                return
+            try:
+                db.execute(f"DELETE FROM {self.name}")
+                db.commit()
+                self._rows = 0
+            except sqlite3.Error as e:
+                self._disk_error(e)
@@ -1,7 +1,19 @@
-from radon.complexity import cc_visit
 import re
 
-def analyze_code(repo_data: dict):
+from app import github_api
+from app.complexity import compute_complexity, lookup_metrics
+from app.github_fetcher import mark_degraded
+from app.repo_archive import ChunkReader, iter_sources, is_analyzable
+
+def _streamed_metrics(ctx, wanted: set, blob_shas: dict) -> dict:
+    """
+    Streams the repository tarball and hands each wanted Python source to the
+    complexity pool as its member arrives; nothing is kept once a file has been scored.
+    """
+    with github_api.stream_archive(ctx.archive_path) as chunks:
+        return compute_complexity(iter_sources(ChunkReader(chunks), wanted), blob_shas)
+
+def analyze_code(repo_data: dict, ctx=None):
     files = repo_data["files"]
     
     total_files = len(files)
@@ -9,11 +21,12 @@ def analyze_code(repo_data: dict):
     has_src_folder = False
     
     complexity_score = 0
+    python_files = {}
     
     # Analyze files
-    # Note: repo_data["files"] from PyGithub are ContentFile objects
-    # We need to act carefully if files is a list of object.
-    # The snippet used `f.path` and `f.decoded_content`
+    # Note: repo_data["files"] is the full recursive tree as RepoFile objects
+    # (files and directories). Python sources come with `decoded_content` filled in,
+    # except for blobs already in the complexity cache.
     
     for f in files:
         path_lower = f.path.lower()
@@ -22,16 +35,41 @@ def analyze_code(repo_data: dict):
         if "src" in path_lower or "app" in path_lower:
             has_src_folder = True
             
-        # Calculate complexity for Python files
-        if f.name.endswith(".py"):
+        if f.type == "file" and is_analyzable(f.path, f.size):
+            python_files[f.path] = f
+
+    # Complexity: blobs scored by an earlier analysis come from the cache,
+    # only new/changed ones are parsed.
+    blob_shas = {path: f.sha for path, f in python_files.items()}
+    metrics = lookup_metrics(blob_shas)
+    missing = set(python_files) - set(metrics)
+
+    streamed = set()
+    if ctx is not None and ctx.stream_archive and repo_data.get("source") != "git":
+        # Large repos: sources not fetched with the tree come from the archive stream
+        # (a clone has them all, an incremental fetch the changed ones)
+        streamed = {path for path in missing if python_files[path].decoded_content is None}
+    if streamed:
+        try:
+            metrics.update(_streamed_metrics(ctx, streamed, blob_shas))
+        except Exception as e:
+            print(f"Archive streaming failed: {str(e)}")
+            mark_degraded(repo_data, "complexity")
+    if missing - streamed:
+        sources = {}
+        for path in missing - streamed:
+            f = python_files[path]
             try:
-                content = f.decoded_content.decode('utf-8')
-                # cc_visit returns a list of blocks, we sum the complexity
-                blocks = cc_visit(content)
-                for block in blocks:
-                    complexity_score += block.complexity
-            except Exception:
+                sources[path] = ctx.file_content(f) if ctx else f.decoded_content.decode('utf-8')
+            except UnicodeDecodeError:
+                # Not UTF-8: never scored, on any run
                 pass
+            except Exception:
+                # Content never fetched
+                mark_degraded(repo_data, "complexity")
+        metrics.update(compute_complexity(sources, blob_shas))
+
+    complexity_score = sum(m["complexity"] for m in metrics.values())
                 
     has_readme = repo_data["readme"] is not None
     readme_score = 0
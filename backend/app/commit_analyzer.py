@@ -1,23 +1,18 @@
-from github import Github
-import os
+from app.github_fetcher import RepoContext, fetch_commit_stats
 
-def get_github_client():
-    token = os.getenv("GITHUB_TOKEN")
-    return Github(token)
-
-def analyze_commits(repo_url: str):
-    g = get_github_client()
+async def analyze_commits(ctx: RepoContext, repo_data: dict = None):
     try:
-        owner, repo = repo_url.replace("https://github.com/", "").split("/")
-        repository = g.get_repo(f"{owner}/{repo}")
-
-        # Get last 20 commits
-        commits = repository.get_commits()
-        total_commits = commits.totalCount # This might be slow for large repos, but per spec
-        
-        # Taking slicing on PaginatedList fetches those items
-        recent_commits = commits[:20]
-        messages = [c.commit.message for c in recent_commits]
+        # fetch_repo_data already fetched the commit data in parallel with the
+        # other calls; only go back to the API when called without it.
+        if repo_data is not None and "commits" in repo_data:
+            stats = repo_data["commits"]
+            if stats is None:
+                raise ValueError("Commit data unavailable")
+        else:
+            # Commit count and the last 20 commits
+            stats = await fetch_commit_stats(ctx)
+        total_commits = stats["total_count"]
+        messages = stats["messages"]
 
         # "Good" message heuristic: more than 3 words
         good_messages = sum(1 for m in messages if len(m.split()) > 3)
@@ -0,0 +1,172 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from starlette.concurrency import run_in_threadpool
+
+from app.cache import TieredCache
+
+# Worker processes shared by every analysis.
+COMPLEXITY_WORKERS = int(os.getenv("COMPLEXITY_WORKERS", str(os.cpu_count() or 1)))
+# Analyses allowed to use the pool at the same time; the rest wait for a slot.
+COMPLEXITY_MAX_JOBS = int(os.getenv("COMPLEXITY_MAX_JOBS", "4"))
+# Files per task sent to a worker - large enough to amortize pickling/IPC.
+COMPLEXITY_BATCH_SIZE = int(os.getenv("COMPLEXITY_BATCH_SIZE", "16"))
+# Below this many files the pool costs more than it saves; score inline.
+COMPLEXITY_POOL_MIN_FILES = int(os.getenv("COMPLEXITY_POOL_MIN_FILES", "8"))
+
+# Per-file results keyed by git blob SHA: identical content always scores the same,
+# across commits and across repos (vendored files, shared templates).
+FILE_CACHE_TTL = float(os.getenv("FILE_CACHE_TTL", str(30 * 24 * 3600)))
+FILE_CACHE_DISK_ITEMS = int(os.getenv("FILE_CACHE_DISK_ITEMS", "200000"))
+
+_file_cache = TieredCache(
+    "file_complexity",
+    ttl=FILE_CACHE_TTL,
+    memory_items=4096,
+    disk_items=FILE_CACHE_DISK_ITEMS,
+)
+
+_pool = None
+# Set when processes can't be started at all (e.g. no /dev/shm on some serverless hosts)
+_pool_unavailable = False
+_pool_lock = threading.Lock()
+_job_slots = threading.BoundedSemaphore(COMPLEXITY_MAX_JOBS)
+
+def file_metrics(source) -> dict:
+    """
+    radon's cyclomatic complexity for one source file: the total over every
+    block, the blocks themselves and the most complex one.
+    Accepts str or utf-8 bytes; unparsable files score 0.
+    """
+    # radon is imported on first use (and once per worker process), not at startup
+    from radon.complexity import cc_visit
+    try:
+        if isinstance(source, bytes):
+            source = source.decode('utf-8')
+        blocks = [{"name": b.name, "lineno": b.lineno, "complexity": b.complexity} for b in cc_visit(source)]
+    except Exception:
+        blocks = []
+    return {
+        # we sum the complexity of all blocks
+        "complexity": sum(b["complexity"] for b in blocks),
+        "blocks": blocks,
+        "max_block": max(blocks, key=lambda b: b["complexity"]) if blocks else None,
+    }
+
+def _cache_key(sha: str) -> str:
+    import radon
+    return f"radon-{radon.__version__}:{sha}"
+
+def lookup_metrics(blob_shas: dict) -> dict:
+    """
+    Returns {path: metrics} for the files in {path: blob_sha} already scored
+    in any earlier analysis.
+    """
+    keys = {path: _cache_key(sha) for path, sha in blob_shas.items() if sha}
+    cached = _file_cache.get_many(keys.values())
+    return {path: cached[key] for path, key in keys.items() if key in cached}
+
+def _score_batch(batch: list) -> list:
+    # Runs in a worker process
+    return [(path, file_metrics(source)) for path, source in batch]
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the server process is multi-threaded
+            _pool = ProcessPoolExecutor(
+                max_workers=COMPLEXITY_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+def _submit(batch):
+    global _pool_unavailable
+    if _pool_unavailable:
+        return None
+    try:
+        return get_pool().submit(_score_batch, batch)
+    except Exception as e:
+        print(f"Complexity pool unavailable ({str(e)}), scoring inline")
+        _pool_unavailable = True
+        return None
+
+def _collect(batch, future) -> list:
+    global _pool
+    if future is not None:
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            # A worker died; start a fresh pool on the next submit
+            print(f"Complexity pool broke ({str(e)}), scoring batch inline")
+            with _pool_lock:
+                _pool = None
+    return _score_batch(batch)
+
+async def run_in_worker(fn, *args):
+    """
+    Runs other CPU-bound work (e.g. bulk PDF export) on the same worker
+    processes, so it doesn't hold the GIL of the server. `fn` and its
+    arguments must be picklable. Falls back to a thread like compute_complexity does.
+    """
+    global _pool, _pool_unavailable
+    if COMPLEXITY_WORKERS > 1 and not _pool_unavailable:
+        try:
+            return await asyncio.get_running_loop().run_in_executor(get_pool(), fn, *args)
+        except BrokenProcessPool as e:
+            print(f"Complexity pool broke ({str(e)}), running {fn.__name__} in a thread")
+            with _pool_lock:
+                _pool = None
+        except OSError as e:
+            print(f"Complexity pool unavailable ({str(e)}), running {fn.__name__} in a thread")
+            _pool_unavailable = True
+    return await run_in_threadpool(fn, *args)
+
+def _batches(sources):
+    batch = []
+    for item in sources:
+        batch.append(item)
+        if len(batch) >= COMPLEXITY_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def compute_complexity(sources, blob_shas: dict = None) -> dict:
+    """
+    Scores (path, source) pairs and returns {path: metrics} (see file_metrics).
+    Results for paths with a blob SHA in `blob_shas` are added to the per-file cache.
+
+    `sources` may be a lazy iterator (e.g. a streamed archive): batches are
+    handed to the process pool as they fill, with at most two batches per
+    worker in flight, so memory stays bounded and scoring overlaps reading.
+    Small inputs are scored inline, and so is everything if the pool can't run.
+    """
+    if isinstance(sources, dict):
+        sources = list(sources.items())
+    if COMPLEXITY_WORKERS <= 1 or (isinstance(sources, list) and len(sources) < COMPLEXITY_POOL_MIN_FILES):
+        results = dict(_score_batch(sources))
+    else:
+        results = {}
+        with _job_slots:
+            in_flight = deque()
+            for batch in _batches(sources):
+                in_flight.append((batch, _submit(batch)))
+                if len(in_flight) >= COMPLEXITY_WORKERS * 2:
+                    results.update(_collect(*in_flight.popleft()))
+            while in_flight:
+                results.update(_collect(*in_flight.popleft()))
+
+    if blob_shas:
+        _file_cache.put_many({
+            _cache_key(blob_shas[path]): metrics
+            for path, metrics in results.items()
+            if blob_shas.get(path)
+        })
+    return results
@@ -0,0 +1,264 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import threading
+
+from app import github_api
+from app.cache import CACHE_DIR
+from app.complexity import lookup_metrics
+from app.github_fetcher import RepoFile, RECENT_COMMITS, fetch_commit_stats, gather_calls
+from app.repo_archive import is_analyzable
+
+# Where fetch_repo_data gets the tree, README and commit log from: "api" (REST/GraphQL,
+# the default), "clone" (a blobless partial clone kept on disk and re-fetched
+# incrementally) or "auto" (clone repos bigger than GIT_CLONE_MIN_SIZE_KB, API otherwise).
+# The repository metadata and head SHA still come from the API either way.
+REPO_BACKEND = os.getenv("REPO_BACKEND", "api")
+GIT_CLONE_MIN_SIZE_KB = int(os.getenv("GIT_CLONE_MIN_SIZE_KB", str(50 * 1024)))
+# Clone source, {owner}/{repo} filled in. A file:// URL serves from a local mirror.
+GIT_CLONE_URL = os.getenv("GIT_CLONE_URL", "https://github.com/{owner}/{repo}.git")
+GIT_CLONE_DIR = os.getenv("GIT_CLONE_DIR", os.path.join(CACHE_DIR, "clones"))
+# Commits of history fetched (0 = all). A shallow clone can't count the whole
+# history, so its commit total comes from the API.
+GIT_CLONE_DEPTH = int(os.getenv("GIT_CLONE_DEPTH", "100"))
+# Clones kept on disk; the least recently analyzed beyond this are deleted.
+GIT_CLONE_MAX_REPOS = int(os.getenv("GIT_CLONE_MAX_REPOS", "50"))
+# Seconds any single git command may take.
+GIT_TIMEOUT = float(os.getenv("GIT_TIMEOUT", "300"))
+
+README_NAMES = ("readme.md", "readme.rst", "readme.txt", "readme")
+
+# One lock per clone: git serializes fetches itself, but eviction must not
+# delete a repository another request is reading
+_locks = {}
+_locks_lock = threading.Lock()
+
+class GitError(Exception):
+    pass
+
+def _git(path, *args, input: bytes = None) -> bytes:
+    command = ["git"] + (["-C", path] if path else []) + list(args)
+    try:
+        completed = subprocess.run(
+            command, input=input, capture_output=True, timeout=GIT_TIMEOUT,
+            # Never wait for credentials on a terminal that isn't there
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise GitError(f"git {args[0]}: {e}")
+    if completed.returncode != 0:
+        raise GitError(f"git {args[0]}: {completed.stderr.decode(errors='replace').strip()}")
+    return completed.stdout
+
+def use_clone(ctx) -> bool:
+    if REPO_BACKEND == "clone":
+        return True
+    return REPO_BACKEND == "auto" and ctx.info.get("size", 0) > GIT_CLONE_MIN_SIZE_KB
+
+def clone_path(owner: str, name: str) -> str:
+    return os.path.join(GIT_CLONE_DIR, owner.lower(), name.lower() + ".git")
+
+def _lock_for(path: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+def _depth_args() -> list:
+    return ["--depth", str(GIT_CLONE_DEPTH)] if GIT_CLONE_DEPTH > 0 else []
+
+def sync(owner: str, name: str) -> str:
+    """
+    Brings the local clone of owner/name up to date with its default branch:
+    a bare, blobless (--filter=blob:none) clone the first time, a fetch of just
+    the new commits and trees afterwards. Call with the repository's lock held.
+    Returns the clone's path; raises GitError.
+    """
+    path = clone_path(owner, name)
+    if os.path.isdir(path):
+        try:
+            branch = _git(path, "symbolic-ref", "--short", "HEAD").decode().strip()
+            _git(path, "fetch", "--filter=blob:none", "--no-tags", *_depth_args(),
+                 "origin", f"+refs/heads/{branch}:refs/heads/{branch}")
+            os.utime(path)
+            return path
+        except GitError as e:
+            # Default branch renamed, corrupt clone, ...: start over
+            print(f"Fetch into {path} failed ({str(e)}), cloning again")
+            shutil.rmtree(path, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.partial-{os.getpid()}"
+    shutil.rmtree(partial, ignore_errors=True)
+    try:
+        _git(None, "clone", "--bare", "--filter=blob:none", "--single-branch", "--no-tags", *_depth_args(),
+             GIT_CLONE_URL.format(owner=owner, repo=name), partial)
+        os.rename(partial, path)
+    finally:
+        shutil.rmtree(partial, ignore_errors=True)
+    return path
+
+def evict(keep: str = None):
+    """
+    Deletes the least recently synced clones beyond GIT_CLONE_MAX_REPOS,
+    skipping any that are in use.
+    """
+    if not os.path.isdir(GIT_CLONE_DIR):
+        return
+    clones = [
+        os.path.join(GIT_CLONE_DIR, owner, repo)
+        for owner in os.listdir(GIT_CLONE_DIR)
+        if os.path.isdir(os.path.join(GIT_CLONE_DIR, owner))
+        for repo in os.listdir(os.path.join(GIT_CLONE_DIR, owner))
+        if repo.endswith(".git")
+    ]
+    clones.sort(key=os.path.getmtime, reverse=True)
+    for path in clones[GIT_CLONE_MAX_REPOS:]:
+        lock = _lock_for(path)
+        if path == keep or not lock.acquire(blocking=False):
+            continue
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            lock.release()
+
+def read_tree(path: str) -> list:
+    """
+    [(type, sha, path)] for every blob and tree at HEAD. Reads only tree
+    objects, so no file contents are downloaded.
+    """
+    entries = []
+    for record in _git(path, "ls-tree", "-r", "-t", "-z", "--full-tree", "HEAD").split(b"\0"):
+        if not record:
+            continue
+        meta, file_path = record.split(b"\t", 1)
+        _, kind, sha = meta.decode().split()
+        if kind in ("blob", "tree"):
+            entries.append((kind, sha, file_path.decode(errors="replace")))
+    return entries
+
+def _local_blobs(path: str) -> set:
+    # Every blob already in the clone (what earlier analyses downloaded)
+    out = _git(path, "cat-file", "--batch-all-objects", "--batch-check=%(objecttype) %(objectname)")
+    return {line[5:] for line in out.decode().splitlines() if line.startswith("blob ")}
+
+def read_blobs(path: str, shas) -> dict:
+    """
+    {sha: bytes} for the given blobs. The ones not downloaded yet are fetched
+    from the promisor remote in a single request first (reading them one by
+    one would lazily fetch each separately).
+    """
+    shas = sorted(set(shas))
+    if not shas:
+        return {}
+    missing = set(shas) - _local_blobs(path)
+    if missing:
+        _git(path, "-c", "fetch.negotiationAlgorithm=noop", "fetch", "origin", "--no-tags",
+             "--no-write-fetch-head", "--recurse-submodules=no", "--filter=blob:none", "--stdin",
+             input="\n".join(sorted(missing)).encode() + b"\n")
+
+    out = _git(path, "cat-file", "--batch", input="\n".join(shas).encode() + b"\n")
+    blobs = {}
+    position = 0
+    while position < len(out):
+        header_end = out.index(b"\n", position)
+        header = out[position:header_end].decode().split()
+        position = header_end + 1
+        if len(header) < 3:
+            # "<sha> missing"
+            continue
+        size = int(header[2])
+        blobs[header[0]] = out[position:position + size]
+        position += size + 1
+    return blobs
+
+def read_log(path: str, count: int = RECENT_COMMITS) -> list:
+    out = _git(path, "log", f"-n{count}", "--format=%B%x00", "HEAD").decode(errors="replace")
+    return [message.strip() for message in out.split("\0") if message.strip()]
+
+def commit_count(path: str):
+    """
+    (commits reachable from HEAD locally, whether the clone is shallow).
+    """
+    count = int(_git(path, "rev-list", "--count", "HEAD").decode())
+    shallow = _git(path, "rev-parse", "--is-shallow-repository").decode().strip() == "true"
+    return count, shallow
+
+def _read_clone(owner: str, name: str) -> dict:
+    # Blocking: sync the clone, then read everything the analyzers need from it
+    path = clone_path(owner, name)
+    with _lock_for(path):
+        sync(owner, name)
+        entries = read_tree(path)
+        blob_shas = {file_path: sha for kind, sha, file_path in entries if kind == "blob"}
+
+        # Python sources whose complexity isn't cached yet, plus the README
+        python_files = {p: sha for p, sha in blob_shas.items() if is_analyzable(p, 0)}
+        cached = lookup_metrics(python_files)
+        wanted = {p: sha for p, sha in python_files.items() if p not in cached}
+        readme_path = next((p for n in README_NAMES for p in blob_shas if p.lower() == n), None)
+        if readme_path:
+            wanted[readme_path] = blob_shas[readme_path]
+        contents = read_blobs(path, wanted.values())
+
+        files = []
+        for kind, sha, file_path in entries:
+            if kind == "tree":
+                files.append(RepoFile(file_path, os.path.basename(file_path), "dir", sha=sha))
+                continue
+            content = contents.get(sha)
+            size = len(content) if content is not None else 0
+            is_source = file_path in wanted and file_path != readme_path
+            files.append(RepoFile(file_path, os.path.basename(file_path), "file", size,
+                                  decoded_content=content if is_source else None, sha=sha))
+
+        readme = contents.get(blob_shas[readme_path]) if readme_path else None
+        total, shallow = commit_count(path)
+        messages = read_log(path)
+    evict(keep=path)
+    return {
+        "files": files,
+        "readme": readme.decode(errors="replace") if readme is not None else None,
+        "commits": {"total_count": total, "messages": messages},
+        "shallow": shallow,
+    }
+
+async def fetch_repo_data_from_clone(ctx):
+    """
+    fetch_repo_data from a local partial clone: the tree, README, Python
+    sources and commit log are read with git plumbing, and only the languages
+    (and for shallow clones the commit total) come from the API. Raises
+    GitError when the clone can't be synced; the caller falls back to the API.
+    """
+    results = await gather_calls({
+        "languages": github_api.get_json(f"{ctx.api_path}/languages"),
+        "clone": asyncio.to_thread(_read_clone, ctx.owner, ctx.name),
+    }, timeouts={"clone": GIT_TIMEOUT * 3})
+    local = results["clone"]
+    if isinstance(local, Exception):
+        raise local
+
+    degraded = ["languages"] if isinstance(results["languages"], Exception) else []
+    commits = local["commits"]
+    if local["shallow"]:
+        try:
+            commits = {**commits, "total_count": (await fetch_commit_stats(ctx))["total_count"]}
+        except Exception as e:
+            print(f"Commit count from the API failed ({str(e)}), using the clone's {commits['total_count']}")
+            degraded.append("commits")
+
+    languages = results["languages"]
+    info = ctx.info
+    return {
+        "name": info["name"],
+        "stars": info.get("stargazers_count", 0),
+        "forks": info.get("forks_count", 0),
+        "languages": {} if isinstance(languages, Exception) else languages,
+        "files": local["files"],
+        "readme": local["readme"],
+        "commits": commits,
+        "default_branch": info.get("default_branch"),
+        "has_api": False,
+        # Sources are already in `files`: analyze_code must not stream the archive
+        "source": "git",
+        "degraded": degraded,
+    }
@@ -0,0 +1,251 @@
+import asyncio
+import base64
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+
+import httpx
+
+from app import metrics
+from app.cache import TieredCache
+from app.rate_limit import scheduler, is_rate_limited
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+# Max open connections per event loop to the GitHub API.
+GITHUB_POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", "20"))
+# Seconds each GitHub call may take before we give up on it.
+GITHUB_CALL_TIMEOUT = float(os.getenv("GITHUB_CALL_TIMEOUT", "10"))
+# Archive downloads are much larger than JSON calls and get their own deadline.
+GITHUB_ARCHIVE_TIMEOUT = float(os.getenv("GITHUB_ARCHIVE_TIMEOUT", "60"))
+# Times a rate-limited call is rescheduled (on another token, or after the reset).
+GITHUB_RATE_LIMIT_RETRIES = int(os.getenv("GITHUB_RATE_LIMIT_RETRIES", "3"))
+
+# Conditional-request cache: validators + body per URL. Entries are always
+# revalidated (a 304 doesn't count against the rate limit), the TTL only bounds storage.
+GITHUB_ETAG_CACHE_TTL = float(os.getenv("GITHUB_ETAG_CACHE_TTL", str(7 * 24 * 3600)))
+GITHUB_ETAG_MAX_BODY = int(os.getenv("GITHUB_ETAG_MAX_BODY", str(1024 * 1024)))
+# Bytes of (base64) bodies the memory tier of that cache may hold; the rest is read from disk.
+GITHUB_ETAG_MEMORY_BYTES = int(os.getenv("GITHUB_ETAG_MEMORY_BYTES", str(32 * 1024 * 1024)))
+# Response headers replayed when a cached body is served for a 304.
+_REPLAYED_HEADERS = ("content-type", "link", "etag", "last-modified")
+
+JSON_MEDIA_TYPE = "application/vnd.github+json"
+RAW_MEDIA_TYPE = "application/vnd.github.raw"
+SHA_MEDIA_TYPE = "application/vnd.github.sha"
+
+# httpx connection pools are bound to the event loop that created them, so keep
+# one client per loop (the server loop, plus any loop a worker thread spins up).
+_clients = weakref.WeakKeyDictionary()
+# Held while creating one: warm-up creates the server loop's client from its thread
+_clients_lock = threading.Lock()
+# Blocking client for code that already runs on a worker thread (archive streaming).
+_sync_client = None
+_sync_client_lock = threading.Lock()
+
+_conditional_cache = TieredCache(
+    "github_etags",
+    ttl=GITHUB_ETAG_CACHE_TTL,
+    memory_items=1024,
+    disk_items=20000,
+    memory_bytes=GITHUB_ETAG_MEMORY_BYTES,
+    weigh=lambda entry: len(entry["body"]),
+)
+
+class GitHubAPIError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+def get_async_client(loop: asyncio.AbstractEventLoop = None) -> httpx.AsyncClient:
+    """
+    Returns the pooled client for the running event loop (or the given one),
+    creating it on first use.
+    """
+    loop = loop or asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        with _clients_lock:
+            client = _clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    base_url=GITHUB_API_URL,
+                    timeout=GITHUB_CALL_TIMEOUT,
+                    limits=httpx.Limits(max_connections=GITHUB_POOL_SIZE, max_keepalive_connections=GITHUB_POOL_SIZE),
+                    follow_redirects=True,
+                )
+                _clients[loop] = client
+    return client
+
+def get_sync_client() -> httpx.Client:
+    global _sync_client
+    with _sync_client_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(
+                base_url=GITHUB_API_URL,
+                timeout=GITHUB_CALL_TIMEOUT,
+                limits=httpx.Limits(max_connections=GITHUB_POOL_SIZE, max_keepalive_connections=GITHUB_POOL_SIZE),
+                follow_redirects=True,
+            )
+        return _sync_client
+
+def _headers(accept: str = JSON_MEDIA_TYPE, token=None) -> dict:
+    headers = {"Accept": accept, "X-GitHub-Api-Version": "2022-11-28"}
+    if token is not None and token.value:
+        headers["Authorization"] = f"Bearer {token.value}"
+    return headers
+
+def rate_limit_status(resource: str = "core"):
+    """
+    The rate-limit budget GitHub last reported for `resource`, summed over the
+    token pool ({"limit", "remaining", "reset"}), or None before the first response.
+    Per-token figures are in rate_limit.scheduler.status().
+    """
+    return scheduler.combined(resource)
+
+async def _send(method: str, url, accept: str = None, resource: str = "core", headers: dict = None, **kwargs) -> httpx.Response:
+    """
+    Sends one API call on a token from the pool. A rate-limited answer is
+    rescheduled (the scheduler moves to another token or waits for the reset).
+    """
+    client = get_async_client()
+    for _ in range(GITHUB_RATE_LIMIT_RETRIES + 1):
+        token = await scheduler.acquire(resource)
+        response = None
+        try:
+            response = await client.request(
+                method, url, headers={**_headers(accept or JSON_MEDIA_TYPE, token), **(headers or {})}, **kwargs
+            )
+        finally:
+            scheduler.release(token, resource, response)
+        metrics.github_requests.inc(resource, response.status_code)
+        if not is_rate_limited(response):
+            break
+        print(f"GitHub rate limit hit on token {token.label}, rescheduling")
+    return response
+
+def _raise_for_status(response: httpx.Response):
+    if response.status_code < 400:
+        return
+    try:
+        message = response.json().get("message", response.text)
+    except Exception:
+        message = response.text
+    raise GitHubAPIError(response.status_code, message)
+
+def _conditional_key(url: httpx.URL, accept: str) -> str:
+    # GitHub varies responses on Accept and Authorization. Every token of the pool
+    # belongs to this server, so they share entries (a 304 is also free on any token)
+    auth = "token" if scheduler.has_token() else "anonymous"
+    return f"{accept} {auth} {url}"
+
+async def _remember_validators(key: str, response: httpx.Response):
+    etag = response.headers.get("etag")
+    last_modified = response.headers.get("last-modified")
+    if response.status_code != 200 or not (etag or last_modified):
+        return
+    if len(response.content) > GITHUB_ETAG_MAX_BODY:
+        return
+    await _conditional_cache.put_async(key, {
+        "headers": {h: response.headers[h] for h in _REPLAYED_HEADERS if h in response.headers},
+        "body": base64.b64encode(response.content).decode(),
+    })
+
+async def request(path: str, params: dict = None, accept: str = None) -> httpx.Response:
+    """
+    GETs an API path (or absolute URL) and raises GitHubAPIError on 4xx/5xx.
+    Responses carrying an ETag/Last-Modified are cached and revalidated with
+    If-None-Match/If-Modified-Since; a 304 is answered from the cache.
+    """
+    client = get_async_client()
+    accept = accept or JSON_MEDIA_TYPE
+    url = client.build_request("GET", path, params=params).url
+    key = _conditional_key(url, accept)
+
+    headers = {}
+    cached = await _conditional_cache.get_async(key)
+    if cached:
+        if "etag" in cached["headers"]:
+            headers["If-None-Match"] = cached["headers"]["etag"]
+        if "last-modified" in cached["headers"]:
+            headers["If-Modified-Since"] = cached["headers"]["last-modified"]
+
+    response = await _send("GET", url, accept=accept, headers=headers)
+    if response.status_code == 304 and cached:
+        return httpx.Response(
+            200,
+            headers=cached["headers"],
+            content=base64.b64decode(cached["body"]),
+            request=response.request,
+        )
+
+    _raise_for_status(response)
+    await _remember_validators(key, response)
+    return response
+
+async def get_json(path: str, params: dict = None):
+    response = await request(path, params=params)
+    return response.json()
+
+async def get_raw(path: str, params: dict = None) -> bytes:
+    """
+    Fetches a contents/readme endpoint as raw bytes instead of base64 JSON.
+    """
+    response = await request(path, params=params, accept=RAW_MEDIA_TYPE)
+    return response.content
+
+def has_token() -> bool:
+    return scheduler.has_token()
+
+async def graphql(query: str, variables: dict = None) -> dict:
+    """
+    Runs a GraphQL query (needs a token) and returns its `data`.
+    GraphQL reports failures in the body, those raise GitHubAPIError too.
+    """
+    response = await _send("POST", "/graphql", resource="graphql", json={"query": query, "variables": variables or {}})
+    _raise_for_status(response)
+    body = response.json()
+    if body.get("errors"):
+        raise GitHubAPIError(response.status_code, body["errors"][0].get("message", "GraphQL error"))
+    return body["data"]
+
+async def get_archive(path: str) -> bytes:
+    """
+    Downloads a tarball/zipball endpoint. GitHub redirects these to codeload,
+    which the client follows; archives bypass the conditional-request cache.
+    """
+    response = await _send("GET", path, timeout=GITHUB_ARCHIVE_TIMEOUT)
+    _raise_for_status(response)
+    return response.content
+
+@contextmanager
+def stream_archive(path: str):
+    """
+    Opens a tarball/zipball endpoint as a streaming download (blocking; call it
+    from a worker thread). Yields an iterator of byte chunks as they arrive.
+    """
+    client = get_sync_client()
+    token = scheduler.acquire_sync()
+    try:
+        with client.stream("GET", path, headers=_headers(token=token), timeout=GITHUB_ARCHIVE_TIMEOUT) as response:
+            scheduler.release(token, "core", response)
+            token = None
+            metrics.github_requests.inc("core", response.status_code)
+            if response.status_code >= 400:
+                response.read()
+                _raise_for_status(response)
+            yield response.iter_bytes()
+    finally:
+        if token is not None:
+            scheduler.release(token, "core")
+
+def last_page(response: httpx.Response):
+    """
+    Returns the page number of the rel="last" Link, or None for single-page results.
+    """
+    last = response.links.get("last")
+    if not last:
+        return None
+    page = httpx.URL(last["url"]).params.get("page")
+    return int(page) if page else None
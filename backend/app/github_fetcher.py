@@ -1,70 +1,290 @@
-from github import Github
+import asyncio
 import os
+import posixpath
+import re
 
-def get_github_client():
-    token = os.getenv("GITHUB_TOKEN")
-    if not token or token.strip() == "":
-        token = None
-    # retry=0 ensures we throw an exception immediately instead of sleeping for rate limit reset
-    return Github(token, retry=0)
+from app import github_api
+from app.github_api import GITHUB_CALL_TIMEOUT, GITHUB_ARCHIVE_TIMEOUT
+from app.complexity import lookup_metrics
+from app.repo_archive import read_sources, is_analyzable
 
-def fetch_repo_data(repo_url: str):
+# Repos bigger than this (GitHub's `size`, in KB) are not downloaded up front;
+# analyze_code streams their archive instead.
+ARCHIVE_STREAM_THRESHOLD_KB = int(os.getenv("ARCHIVE_STREAM_THRESHOLD_KB", str(20 * 1024)))
+
+# Number of recent commits whose messages feed the commit heuristics.
+RECENT_COMMITS = 20
+
+def parse_repo_url(repo_url: str):
+    """
+    Extracts (owner, repo_name) from the supported URL formats:
+    https://github.com/owner/repo, github.com/owner/repo, owner/repo
+    """
+    # Strip trailing .git suffix safely
+    clean_url = repo_url.strip().rstrip("/")
+    if clean_url.endswith(".git"):
+        clean_url = clean_url[:-4]
+
+    match = re.search(r'github\.com[:/]([^/]+)/([^/]+)', clean_url)
+    if match:
+        return match.groups()
+
+    # Try splitting by slash if it looks like owner/repo
+    parts = clean_url.split('/')
+    if len(parts) >= 2:
+        return parts[-2], parts[-1]
+    raise ValueError("Invalid GitHub URL format")
+
+def repo_key(repo_url: str) -> str:
+    """
+    Normalized "owner/repo" for a URL (GitHub names are case-insensitive).
+    Raises ValueError like parse_repo_url.
+    """
+    owner, repo_name = parse_repo_url(repo_url)
+    return f"{owner.lower()}/{repo_name.lower()}"
+
+class RepoFile:
+    """
+    A file or directory from the repository tree. Mirrors the attributes of
+    PyGithub's ContentFile that the analyzers use (path, name, decoded_content);
+    `sha` is the git blob/tree SHA.
+    """
+
+    def __init__(self, path: str, name: str, type: str = "file", size: int = 0, decoded_content: bytes = None,
+                 sha: str = None):
+        self.path = path
+        self.name = name
+        self.type = type
+        self.size = size
+        self.decoded_content = decoded_content
+        self.sha = sha
+
+class RepoContext:
+    """
+    Everything the analyzers need about one repository, resolved once per request.
+    `info` is the repository JSON from GET /repos/{owner}/{repo}, so
+    fetch_repo_data, analyze_code and analyze_commits never re-fetch it.
+    """
+
+    def __init__(self, owner: str, name: str, info: dict):
+        self.owner = owner
+        self.name = name
+        self.info = info
+
+    @property
+    def full_name(self):
+        return f"{self.owner}/{self.name}"
+
+    @property
+    def api_path(self):
+        return f"/repos/{self.owner}/{self.name}"
+
+    @property
+    def ref(self):
+        return self.info.get("default_branch") or "HEAD"
+
+    @property
+    def archive_path(self):
+        return f"{self.api_path}/tarball/{self.ref}"
+
+    @property
+    def stream_archive(self):
+        # Large repos are streamed through radon instead of being buffered
+        return self.info.get("size", 0) > ARCHIVE_STREAM_THRESHOLD_KB
+
+    def file_content(self, f) -> str:
+        if f.decoded_content is None:
+            raise ValueError(f"Content of {f.path} was not fetched")
+        return f.decoded_content.decode('utf-8')
+
+def mark_degraded(repo_data: dict, part: str):
+    """
+    Records that `part` of repo_data ("languages", "readme", "commits",
+    "files", "complexity") is missing because a call failed (or GitHub cut
+    it short), not because the repo lacks it. Such an analysis is answered
+    but never cached.
+    """
+    degraded = repo_data.setdefault("degraded", [])
+    if part not in degraded:
+        degraded.append(part)
+
+async def get_repo_context(repo_url: str) -> RepoContext:
+    """
+    Parses the URL and resolves the repository with a single API call.
+    Raises on invalid URLs or GitHub errors.
+    """
+    owner, repo_name = parse_repo_url(repo_url)
+    print(f"Parsed Owner: {owner}, Repo: {repo_name}")
+
+    info = await github_api.get_json(f"/repos/{owner}/{repo_name}")
+    print(f"Successfully fetched repo object: {info['name']}")
+    return RepoContext(owner, repo_name, info)
+
+async def fetch_head_sha(owner: str, repo_name: str) -> str:
+    """
+    Resolves the default branch head to a commit SHA in one request
+    (the sha media type returns just the 40 hex characters).
+    """
+    response = await github_api.request(f"/repos/{owner}/{repo_name}/commits/HEAD", accept=github_api.SHA_MEDIA_TYPE)
+    return response.text.strip()
+
+async def gather_calls(calls: dict, timeout: float = GITHUB_CALL_TIMEOUT, timeouts: dict = None) -> dict:
     """
-    Fetches comprehensive repository data using PyGithub.
+    Awaits independent coroutines concurrently. Returns {name: result}; a call
+    that raised or did not finish within `timeout` seconds (or its entry in
+    `timeouts`) maps to its exception.
     """
-    g = get_github_client()
-    
-    import re
-    from github import GithubException
+    timeouts = timeouts or {}
+
+    async def bounded(name, coro):
+        limit = timeouts.get(name, timeout)
+        try:
+            return await asyncio.wait_for(coro, limit)
+        except asyncio.TimeoutError:
+            return TimeoutError(f"GitHub call '{name}' timed out after {limit}s")
+        except Exception as e:
+            return e
+
+    results = await asyncio.gather(*(bounded(name, c) for name, c in calls.items()))
+    return dict(zip(calls.keys(), results))
+
+async def fetch_readme(ctx: RepoContext):
     try:
-        # Regex to match owner/repo from various formats:
-        # https://github.com/owner/repo
-        # github.com/owner/repo
-        # owner/repo
-        
-        # Strip trailing .git suffix safely
-        clean_url = repo_url.strip()
-        if clean_url.endswith(".git"):
-            clean_url = clean_url[:-4]
-        
-        match = re.search(r'github\.com[:/]([^/]+)/([^/]+)', clean_url)
-        if match:
-            owner, repo_name = match.groups()
-        else:
-            # Try splitting by slash if it looks like owner/repo
-            parts = clean_url.split('/')
-            if len(parts) >= 2:
-                owner, repo_name = parts[-2], parts[-1]
-            else:
-                 raise ValueError("Invalid GitHub URL format")
-        
-        print(f"Parsed Owner: {owner}, Repo: {repo_name}")
-        
-        # Attempt to get repo
-        repository = g.get_repo(f"{owner}/{repo_name}")
-        print(f"Successfully fetched repo object: {repository.name}")
-        
-        # Get language breakdown
-        languages = repository.get_languages()
-        
-        # Get readme
+        return (await github_api.get_raw(f"{ctx.api_path}/readme")).decode()
+    except github_api.GitHubAPIError as e:
+        if e.status == 404:
+            return None
+        raise
+
+async def _list_tree(ctx: RepoContext):
+    """
+    Lists the whole repository with one recursive tree call, then pulls every
+    Python source out of a single tarball download - a fixed number of
+    requests no matter how many files the repo has. The download is skipped
+    when every blob is in the complexity cache, and for large repos, whose
+    archive analyze_code streams instead (ctx.stream_archive).
+    Returns (files, truncated): GitHub cuts very large listings short.
+    """
+    tree = await github_api.get_json(f"{ctx.api_path}/git/trees/{ctx.ref}", params={"recursive": 1})
+    truncated = bool(tree.get("truncated"))
+    if truncated:
+        print(f"Tree listing for {ctx.full_name} was truncated by GitHub")
+
+    files = [
+        RepoFile(item["path"], posixpath.basename(item["path"]), "dir" if item["type"] == "tree" else "file",
+                 item.get("size", 0), sha=item["sha"])
+        for item in tree["tree"]
+        if item["type"] in ("blob", "tree")
+    ]
+
+    # analyze_code is pure CPU, so pull the Python sources it needs up front -
+    # skipping blobs whose complexity is already cached (often all of them).
+    python_files = {f.path: f for f in files if f.type == "file" and is_analyzable(f.path, f.size)}
+    cached = await asyncio.to_thread(lookup_metrics, {path: f.sha for path, f in python_files.items()})
+    python_files = {path: f for path, f in python_files.items() if path not in cached}
+    if python_files and not ctx.stream_archive:
+        archive = await github_api.get_archive(ctx.archive_path)
+        # Decompressing is CPU work, keep it off the event loop
+        sources = await asyncio.to_thread(read_sources, archive, set(python_files))
+        for path, content in sources.items():
+            python_files[path].decoded_content = content
+    return files, truncated
+
+COMMIT_STATS_QUERY = """
+query($owner: String!, $name: String!, $n: Int!) {
+  repository(owner: $owner, name: $name) {
+    defaultBranchRef {
+      target {
+        ... on Commit {
+          history(first: $n) { totalCount nodes { message } }
+        }
+      }
+    }
+  }
+}
+"""
+
+async def _commit_stats_graphql(ctx: RepoContext) -> dict:
+    data = await github_api.graphql(COMMIT_STATS_QUERY, {"owner": ctx.owner, "name": ctx.name, "n": RECENT_COMMITS})
+    branch = data["repository"]["defaultBranchRef"]
+    if branch is None:
+        raise ValueError("Repository has no commits")
+    history = branch["target"]["history"]
+    return {
+        "total_count": history["totalCount"],
+        "messages": [node["message"] for node in history["nodes"]],
+    }
+
+async def _commit_stats_rest(ctx: RepoContext) -> dict:
+    # The first page carries the recent messages; its Link header says how many
+    # pages follow, so the count only needs the (partial) last page on top.
+    response = await github_api.request(f"{ctx.api_path}/commits", params={"per_page": RECENT_COMMITS})
+    messages = [c["commit"]["message"] for c in response.json()]
+    last = github_api.last_page(response)
+    if last is None:
+        return {"total_count": len(messages), "messages": messages}
+
+    tail = await github_api.get_json(f"{ctx.api_path}/commits", params={"per_page": RECENT_COMMITS, "page": last})
+    return {"total_count": (last - 1) * RECENT_COMMITS + len(tail), "messages": messages}
+
+async def fetch_commit_stats(ctx: RepoContext) -> dict:
+    """
+    Total commit count and the last RECENT_COMMITS messages of the default branch.
+    With a token this is a single GraphQL request (history.totalCount + nodes),
+    without one (or if GraphQL fails) one or two REST requests - never a walk
+    over the commit list, however long the history is.
+    """
+    if github_api.has_token():
         try:
-            readme = repository.get_readme().decoded_content.decode()
-        except:
+            return await _commit_stats_graphql(ctx)
+        except Exception as e:
+            print(f"GraphQL commit stats failed ({str(e)}), using REST")
+    return await _commit_stats_rest(ctx)
+
+async def fetch_repo_data(ctx: RepoContext):
+    """
+    Fetches comprehensive repository data from the GitHub REST API.
+    The independent API calls (languages, readme, root listing and the commit
+    data used by analyze_commits) are issued concurrently.
+    """
+    try:
+        results = await gather_calls({
+            "languages": github_api.get_json(f"{ctx.api_path}/languages"),
+            "readme": fetch_readme(ctx),
+            "files": _list_tree(ctx),
+            "commits": fetch_commit_stats(ctx),
+        }, timeouts={"files": GITHUB_CALL_TIMEOUT + GITHUB_ARCHIVE_TIMEOUT})
+
+        # The file tree is required for the analysis, everything else degrades.
+        if isinstance(results["files"], Exception):
+            raise results["files"]
+        files, truncated = results["files"]
+
+        languages = results["languages"]
+        if isinstance(languages, Exception):
+            languages = {}
+
+        readme = results["readme"]
+        if isinstance(readme, Exception):
             readme = None
-            
-        # Get top-level files (simplification for "files")
-        files = repository.get_contents("")
-        
+
+        commits = results["commits"]
+        if isinstance(commits, Exception):
+            commits = None
+
+        info = ctx.info
         return {
-            "name": repository.name,
-            "stars": repository.stargazers_count,
-            "forks": repository.forks_count,
+            "name": info["name"],
+            "stars": info.get("stargazers_count", 0),
+            "forks": info.get("forks_count", 0),
             "languages": languages,
             "files": files,
             "readme": readme,
-            "default_branch": repository.default_branch,
-            "has_api": True
+            "commits": commits,
+            "default_branch": info.get("default_branch"),
+            "has_api": True,
+            "degraded": [name for name in ("languages", "readme", "commits") if isinstance(results[name], Exception)]
+                        + (["files"] if truncated else []),
         }
     except Exception as e:
         print(f"GitHub Fetch Error: {str(e)}")
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import posixpath
+
+from app import github_api
+from app.cache import TieredCache
+from app.complexity import lookup_metrics
+from app.github_fetcher import RepoContext, RepoFile, RECENT_COMMITS, gather_calls, fetch_readme
+from app.repo_archive import is_analyzable
+
+# How long the last grade of a repo is remembered as the base for incremental runs.
+REPO_STATE_TTL = float(os.getenv("REPO_STATE_TTL", str(90 * 24 * 3600)))
+# Repos with more files than this don't get a stored state (it holds the whole tree).
+INCREMENTAL_MAX_FILES = int(os.getenv("INCREMENTAL_MAX_FILES", "50000"))
+# More Python sources than this to (re)fetch and the tarball path is cheaper.
+INCREMENTAL_MAX_FETCHES = int(os.getenv("INCREMENTAL_MAX_FETCHES", "100"))
+# The compare API lists at most 300 files and 250 commits.
+COMPARE_MAX_FILES = 300
+
+repo_states = TieredCache(
+    "repo_state",
+    ttl=REPO_STATE_TTL,
+    memory_items=128,
+    disk_items=20000,
+)
+
+def _state_key(ctx: RepoContext) -> str:
+    return ctx.full_name.lower()
+
+async def load_state(ctx: RepoContext):
+    """
+    The state saved by the last analysis of this repo, or None.
+    """
+    return await repo_states.get_async(_state_key(ctx))
+
+async def save_state(ctx: RepoContext, head_sha: str, repo_data: dict, result: dict):
+    """
+    Remembers what an analysis saw (tree blobs, commit data, metrics, score)
+    so the next one can work from a diff.
+    """
+    blobs = {f.path: [f.sha, f.size] for f in repo_data["files"] if f.type == "file"}
+    if not head_sha or len(blobs) > INCREMENTAL_MAX_FILES or not repo_data.get("commits"):
+        return
+    await repo_states.put_async(_state_key(ctx), {
+        "sha": head_sha,
+        "blobs": blobs,
+        "commits": repo_data["commits"],
+        "score": result["score"],
+        "code": result["details"]["code"],
+        "commit_metrics": result["details"]["commits"],
+    })
+
+def _tree_from_blobs(blobs: dict) -> list:
+    # The tree listing has an entry per directory too; rebuild them from the file paths
+    dirs = set()
+    for path in blobs:
+        parent = posixpath.dirname(path)
+        while parent and parent not in dirs:
+            dirs.add(parent)
+            parent = posixpath.dirname(parent)
+    files = [RepoFile(d, posixpath.basename(d), "dir") for d in sorted(dirs)]
+    files += [RepoFile(path, posixpath.basename(path), "file", size or 0, sha=sha) for path, (sha, size) in blobs.items()]
+    return files
+
+async def fetch_repo_data_incremental(ctx: RepoContext, head_sha: str, state: dict):
+    """
+    Builds the same repo_data as fetch_repo_data from the previous state plus
+    the compare API diff (changed files and new commits). Only changed Python
+    sources are downloaded; unchanged ones keep their cached complexity.
+    Returns None when a delta can't be trusted (force-push, diff too large,
+    too many files to fetch) - the caller then does a full fetch.
+    """
+    base = state["sha"]
+    compare = await github_api.get_json(f"{ctx.api_path}/compare/{base}...{head_sha}")
+    if compare.get("status") not in ("ahead", "identical"):
+        return None
+    changed = compare.get("files", [])
+    new_commits = compare.get("commits", [])
+    if len(changed) >= COMPARE_MAX_FILES or compare.get("ahead_by", 0) > len(new_commits):
+        return None
+
+    blobs = {path: list(entry) for path, entry in state["blobs"].items()}
+    for f in changed:
+        if f["status"] == "removed":
+            blobs.pop(f["filename"], None)
+            continue
+        if f["status"] == "renamed":
+            blobs.pop(f.get("previous_filename"), None)
+        # The compare API has no sizes; Python ones are filled in once fetched
+        blobs[f["filename"]] = [f["sha"], None]
+
+    # Python sources to download: changed ones, plus any whose cached result expired
+    candidates = {path: sha for path, (sha, size) in blobs.items() if is_analyzable(path, size or 0)}
+    cached = await asyncio.to_thread(lookup_metrics, candidates)
+    to_fetch = [path for path in candidates if path not in cached]
+    if len(to_fetch) > INCREMENTAL_MAX_FETCHES:
+        return None
+
+    results = await gather_calls({
+        "languages": github_api.get_json(f"{ctx.api_path}/languages"),
+        "readme": fetch_readme(ctx),
+        **{path: github_api.get_raw(f"{ctx.api_path}/contents/{path}", params={"ref": head_sha}) for path in to_fetch},
+    })
+    contents = {}
+    for path in to_fetch:
+        if isinstance(results[path], Exception):
+            return None
+        contents[path] = results[path]
+        blobs[path][1] = len(results[path])
+    for path, entry in blobs.items():
+        if entry[1] is None:
+            entry[1] = 0
+
+    files = _tree_from_blobs(blobs)
+    for f in files:
+        if f.path in contents:
+            f.decoded_content = contents[f.path]
+
+    # Compare lists commits oldest first; the stored messages are newest first
+    messages = [c["commit"]["message"] for c in reversed(new_commits)] + state["commits"]["messages"]
+
+    languages = results["languages"]
+    readme = results["readme"]
+    info = ctx.info
+    return {
+        "name": info["name"],
+        "stars": info.get("stargazers_count", 0),
+        "forks": info.get("forks_count", 0),
+        "languages": {} if isinstance(languages, Exception) else languages,
+        "files": files,
+        "readme": None if isinstance(readme, Exception) else readme,
+        "commits": {
+            "total_count": state["commits"]["total_count"] + compare.get("ahead_by", 0),
+            "messages": messages[:RECENT_COMMITS],
+        },
+        "default_branch": info.get("default_branch"),
+        "has_api": True,
+        "incremental_base": base,
+        "degraded": [name for name in ("languages", "readme") if isinstance(results[name], Exception)],
+    }
+
+def describe_changes(state: dict, repo_data: dict, result: dict) -> dict:
+    """
+    What changed since the previous grade: files added/modified/removed
+    (by blob SHA), new commits and the movement of the headline metrics.
+    """
+    old_blobs = state["blobs"]
+    new_blobs = {f.path: f.sha for f in repo_data["files"] if f.type == "file"}
+    code = result["details"]["code"]
+    commits = result["details"]["commits"]
+    return {
+        "since_sha": state["sha"],
+        "mode": "incremental" if repo_data.get("incremental_base") else "full",
+        "new_commits": commits.get("total_commits", 0) - state["commit_metrics"].get("total_commits", 0),
+        "files_added": sorted(p for p in new_blobs if p not in old_blobs),
+        "files_modified": sorted(p for p in new_blobs if p in old_blobs and old_blobs[p][0] != new_blobs[p]),
+        "files_removed": sorted(p for p in old_blobs if p not in new_blobs),
+        "score_delta": result["score"] - state["score"],
+        "complexity_delta": code.get("complexity", 0) - state["code"].get("complexity", 0),
+        "good_commit_ratio_delta": round(commits.get("good_commit_ratio", 0) - state["commit_metrics"].get("good_commit_ratio", 0), 3),
+        "has_tests": {"before": state["code"].get("has_tests"), "after": code.get("has_tests")},
+        "has_src_folder": {"before": state["code"].get("has_src_folder"), "after": code.get("has_src_folder")},
+    }
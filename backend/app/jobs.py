@@ -0,0 +1,218 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from app.cache import CACHE_DIR
+
+# The queue lives in its own SQLite file so it needs no external service and
+# survives restarts; several server processes can share it.
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+# Jobs executed at the same time by each server process.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# How often an idle process looks for jobs submitted by another one.
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# A job "running" for longer than this is assumed orphaned (server killed) and re-queued.
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "900"))
+# Finished jobs are kept this long for GET /api/jobs/{id}.
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 3600)))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class JobQueue:
+    """
+    A persistent FIFO of jobs: {"id", "type", "status", "payload", "result",
+    "error", "created_at", "started_at", "finished_at"}. Claiming a job is a
+    single write transaction, so two workers (or processes) never get the same one.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5, isolation_level=None)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, type TEXT NOT NULL, status TEXT NOT NULL, payload TEXT NOT NULL, "
+                "result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        return self._db
+
+    def submit(self, job_type: str, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn().execute(
+                "INSERT INTO jobs (id, type, status, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, job_type, QUEUED, json.dumps(payload), time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str):
+        """
+        Returns the job as a dict, or None for an unknown ID.
+        """
+        with self._lock:
+            row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def claim(self):
+        """
+        Marks the oldest queued job as running and returns it, or None when the queue is empty.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    db.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (RUNNING, now, row["id"]))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def finish(self, job_id: str, result):
+        with self._lock:
+            self._conn().execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ?",
+                (DONE, json.dumps(result), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str):
+        with self._lock:
+            self._conn().execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id),
+            )
+
+    def requeue(self, job_id: str):
+        with self._lock:
+            self._conn().execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE id = ? AND status = ?",
+                (QUEUED, job_id, RUNNING),
+            )
+
+    def housekeeping(self):
+        """
+        Re-queues orphaned running jobs and drops finished ones past JOB_RETENTION.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            requeued = db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? AND started_at < ?",
+                (QUEUED, RUNNING, now - JOB_STALE_AFTER),
+            ).rowcount
+            db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, now - JOB_RETENTION),
+            )
+        if requeued:
+            print(f"Re-queued {requeued} orphaned job(s)")
+
+queue = JobQueue()
+
+# Job type -> async callable(payload) returning a JSON-serializable result.
+_handlers = {}
+_wakeup = None
+# The poller and housekeeper, and the jobs running right now
+_tasks = []
+_running = set()
+
+def register(job_type: str, handler):
+    _handlers[job_type] = handler
+
+async def submit(job_type: str, payload: dict) -> str:
+    if job_type not in _handlers:
+        raise ValueError(f"Unknown job type: {job_type}")
+    job_id = await asyncio.to_thread(queue.submit, job_type, payload)
+    if _wakeup is not None:
+        _wakeup.set()
+    return job_id
+
+async def _run(job):
+    try:
+        result = await _handlers[job["type"]](job["payload"])
+    except asyncio.CancelledError:
+        # Server shutting down: hand the job to the next worker that starts
+        queue.requeue(job["id"])
+        raise
+    except Exception as e:
+        print(f"Job {job['id']} ({job['type']}) failed: {str(e)}")
+        await asyncio.to_thread(queue.fail, job["id"], str(e))
+    else:
+        await asyncio.to_thread(queue.finish, job["id"], result)
+
+async def _poller():
+    """
+    Claims jobs and runs each as a task, at most JOB_WORKERS at a time. It is
+    the only task claiming, and claims on a worker thread: with several
+    processes on one queue, BEGIN IMMEDIATE can wait on another one's lock.
+    """
+    slots = asyncio.Semaphore(JOB_WORKERS)
+    while True:
+        await slots.acquire()
+        # Cleared before claiming, so a job submitted meanwhile isn't slept through
+        _wakeup.clear()
+        try:
+            job = await asyncio.to_thread(queue.claim)
+        except Exception as e:
+            print(f"Claiming a job failed: {str(e)}")
+            job = None
+        if job is None:
+            slots.release()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        task = asyncio.create_task(_run(job))
+        _running.add(task)
+        task.add_done_callback(_running.discard)
+        task.add_done_callback(lambda done: slots.release())
+
+async def _housekeeper():
+    while True:
+        try:
+            await asyncio.to_thread(queue.housekeeping)
+        except Exception as e:
+            print(f"Job housekeeping failed: {str(e)}")
+        await asyncio.sleep(600)
+
+def start_workers():
+    """
+    Starts the job poller on the running event loop (call from app startup).
+    """
+    global _wakeup
+    _wakeup = asyncio.Event()
+    _tasks.append(asyncio.create_task(_poller()))
+    _tasks.append(asyncio.create_task(_housekeeper()))
+
+async def stop_workers():
+    tasks = _tasks + list(_running)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _tasks.clear()
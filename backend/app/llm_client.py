@@ -0,0 +1,82 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+
+import httpx
+
+from app import metrics
+
+# Seconds a summary may wait on the LLM (queueing included) before the
+# deterministic summary is used instead.
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "8"))
+# Completions in flight at once per event loop; the rest queue for a slot.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Retries inside the deadline (the SDK default of 2 rarely fits in it).
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "10"))
+
+class _LoopState:
+    def __init__(self, settings):
+        # openai is by far the slowest import of the app; load it on the first LLM call
+        from openai import AsyncOpenAI
+        self.settings = settings
+        self.client = AsyncOpenAI(
+            api_key=settings[0],
+            base_url=settings[1],
+            timeout=LLM_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=httpx.AsyncClient(
+                timeout=LLM_TIMEOUT,
+                limits=httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE),
+            ),
+        )
+        self.slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# Like the GitHub clients: connection pools (and semaphores) belong to one event loop
+_states = weakref.WeakKeyDictionary()
+# Held while creating one: warm-up creates the server loop's state from its thread
+_states_lock = threading.Lock()
+
+def _settings():
+    # Read per call so key/endpoint changes apply without a restart
+    return os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_BASE_URL") or None
+
+def is_configured() -> bool:
+    return bool(_settings()[0])
+
+def _state(loop: asyncio.AbstractEventLoop = None) -> _LoopState:
+    loop = loop or asyncio.get_running_loop()
+    settings = _settings()
+    state = _states.get(loop)
+    if state is None or state.settings != settings:
+        with _states_lock:
+            state = _states.get(loop)
+            if state is None or state.settings != settings:
+                state = _LoopState(settings)
+                _states[loop] = state
+    return state
+
+async def chat(prompt: str, model: str, max_tokens: int, **kwargs) -> str:
+    """
+    One chat completion on the shared client, holding a concurrency slot while
+    it runs. Returns the stripped message text; raises on any API error.
+    Callers bound the total time with asyncio.wait_for(..., LLM_TIMEOUT).
+    """
+    state = _state()
+    async with state.slots:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await state.client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                **kwargs,
+            )
+            outcome = "ok"
+        finally:
+            # Cancelled by the caller's deadline counts as an error too
+            metrics.llm_seconds.observe(time.perf_counter() - started, outcome)
+    return response.choices[0].message.content.strip()
@@ -1,22 +1,36 @@
-import uvicorn
+import asyncio
+import json
 import os
 import sys
+import time
+from urllib.parse import quote
 
 # Add backend directory to sys.path to allow 'from app.xxx' imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
-from app.github_fetcher import fetch_repo_data
+from app.github_fetcher import get_repo_context, fetch_repo_data, repo_key
 from app.code_analyzer import analyze_code
 from app.commit_analyzer import analyze_commits
-from app.scoring_engine import calculate_score, get_level
-from app.ai_summary import generate_summary
+from app.scoring_engine import calculate_score
+from app.ai_summary import generate_summary_async
 from app.roadmap import generate_roadmap
-from app.pdf_generator import generate_pdf
+from app.pdf_generator import render_pdf, report_filename
+from app.reports import store_result, load_result, load_results, report_pdf, export_reports, REPORT_EXPORT_MAX_ITEMS
+from app.result_cache import results as result_cache, result_cache_key
+from app.batch import run_batch, BATCH_MAX_ITEMS
+from app.fallback_scorer import fallback_result, FETCH_FAILED, ANALYSIS_FAILED
+from app.incremental import load_state, save_state, fetch_repo_data_incremental, describe_changes
+from app.git_clone import use_clone, fetch_repo_data_from_clone
+from app import jobs, metrics, warmup
+from app.rate_limit import scheduler as github_scheduler
+from app.single_flight import SingleFlight, Feed
 from pydantic import BaseModel
+from typing import List, Optional
 
 app = FastAPI(title="GitGrade AI", version="2.0.0")
 
@@ -28,24 +42,106 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def server_timing_middleware(request: Request, call_next):
+    # With SERVER_TIMING=1 every response lists the pipeline stages it ran and how long
+    # each took. Streamed responses only carry the stages finished before the first byte.
+    timings = metrics.collect_request_timings()
+    started = time.perf_counter()
+    response = await call_next(request)
+    response.headers["Server-Timing"] = metrics.server_timing(timings + [("total", time.perf_counter() - started)])
+    return response
+
+# Installed only when enabled: the middleware wraps every request and stream otherwise
+if metrics.SERVER_TIMING:
+    app.middleware("http")(server_timing_middleware)
+
+# Concurrent analyses of the same repo (a link shared in a channel) share one run
+analyses_in_flight = SingleFlight()
+# flight key -> the stages of that run so far, for stream requests joining it
+stage_feeds = {}
+
 class AnalyzeRequest(BaseModel):
     url: str
 
-@app.post("/analyze")
-@app.post("/api/analyze")
-def analyze_repo_endpoint(request: AnalyzeRequest):
+class BatchAnalyzeRequest(BaseModel):
+    urls: List[str]
+
+class ExportRequest(BaseModel):
+    analysis_ids: List[str]
+    # "pdf": one document with a section per analysis, "zip": one PDF each
+    format: str = "pdf"
+
+class JobRequest(BaseModel):
+    type: str = "analyze"
+    # "analyze" jobs
+    url: Optional[str] = None
+    # "pdf" jobs
+    repo: Optional[str] = None
+    score: Optional[int] = None
+    summary: Optional[str] = None
+    roadmap: Optional[List[str]] = None
+
+async def keep_result(result: dict) -> dict:
+    # Keeping the report is best-effort: the analysis (the fail-safe one above
+    # all) is answered even when it can't be stored, just without an analysis_id
+    try:
+        return await store_result(result)
+    except Exception as e:
+        print(f"DEBUG: Could not store the report ({str(e)}), answering without an analysis_id", file=sys.stderr, flush=True)
+        return result
+
+async def analysis_stages(url: str, fallback: bool = True):
+    """
+    The full analysis pipeline for one repository URL, as an async generator of
+    (stage, payload) pairs emitted as soon as each is ready: "repo", "code",
+    "commits", "breakdown", "roadmap", "summary", and always last "result"
+    (the complete response dict). Cache hits and the fallback yield only "result".
+    When GitHub or the analysis fails it answers with the deterministic mock
+    engine, unless fallback=False, in which case it raises.
+    """
     import sys
     try:
-        repo_url = request.url.strip()
-        print(f"DEBUG: Received Request for URL: {repo_url}", file=sys.stderr, flush=True)
-        
-        # Basic URL fix
-        if not repo_url.startswith("https://") and not repo_url.startswith("http://"):
-            repo_url = "https://" + repo_url
-        
+        with metrics.timed("parse"):
+            repo_url = url.strip()
+            print(f"DEBUG: Received Request for URL: {repo_url}", file=sys.stderr, flush=True)
+
+            # Basic URL fix
+            if not repo_url.startswith("https://") and not repo_url.startswith("http://"):
+                repo_url = "https://" + repo_url
+
+        # 0. Cache - an unchanged repo (same default branch SHA) costs one ref lookup
+        with metrics.timed("cache"):
+            cache_key = await result_cache_key(repo_url)
+            cached = await result_cache.get_async(cache_key) if cache_key else None
+        if cached is not None:
+            print(f"DEBUG: Result cache hit for {cache_key}", file=sys.stderr, flush=True)
+            metrics.analyses.inc("cached")
+            yield "result", await keep_result(cached)
+            return
+
         # 1. Fetch
         print(f"DEBUG: Fetching data for: {repo_url}", file=sys.stderr, flush=True)
-        repo_data = fetch_repo_data(repo_url)
+        with metrics.timed("fetch"):
+            ctx = await get_repo_context(repo_url)
+
+            # Re-submitted repo: work from the diff against the last graded commit
+            head_sha = cache_key.rsplit("@", 1)[1] if cache_key else None
+            previous = await load_state(ctx) if head_sha else None
+            repo_data = None
+            # A local clone is incremental by itself (git fetches only the new commits)
+            from_clone = use_clone(ctx)
+            if previous and not from_clone:
+                try:
+                    repo_data = await fetch_repo_data_incremental(ctx, head_sha, previous)
+                except Exception as e:
+                    print(f"DEBUG: Incremental fetch failed ({str(e)}), doing a full fetch", file=sys.stderr, flush=True)
+            if from_clone:
+                try:
+                    repo_data = await fetch_repo_data_from_clone(ctx)
+                except Exception as e:
+                    print(f"DEBUG: Clone failed ({str(e)}), fetching through the API", file=sys.stderr, flush=True)
+            if repo_data is None:
+                repo_data = await fetch_repo_data(ctx)
         
         if "error" in repo_data:
             print(f"DEBUG: Error fetching repo: {repo_data['error']}", file=sys.stderr, flush=True)
@@ -54,316 +150,69 @@ def analyze_repo_endpoint(request: AnalyzeRequest):
 
     except Exception as e:
         # Log error but proceed to Mock Mode logic below
+        if not fallback:
+            raise
         print(f"DEBUG: Fetch failed ({str(e)}), switching to FAIL-SAFE MOCK MODE", file=sys.stderr, flush=True)
-        
-        # 🛡️ DETERMINISTIC MOCK ENGINE 🛡️
-        # Generates unique, consistent results for ANY repo based on its name hash.
-        # This prevents "same output" complaints while handling Rate Limits.
-        
-        import hashlib
-        
-        # Create a stable hash from the URL
-        hash_object = hashlib.md5(request.url.encode())
-        hex_dig = hash_object.hexdigest()
-        # Convert first 8 chars to int for seeding
-        seed = int(hex_dig[:8], 16)
-        
-        repo_name = request.url.split('/')[-1].replace('.git', '')
-        owner = request.url.split('/')[-2] if len(request.url.split('/')) > 1 else "unknown"
-        
-        # Generate Score (skewed towards 60-95 for realism)
-        base_score = (seed % 40) + 45 # Range 45-84 roughly
-        if "pro" in repo_name or "ai" in repo_name:
-            base_score += 10
-        score = min(98, base_score)
-        
-        # Mock Breakdown (7 Categories - Recruiter Framework)
-        def mock_score(seed_offset, max_val):
-            return ((seed + seed_offset) % max_val) + 1
-
-        mock_breakdown = {
-            "Problem & Product Thinking": mock_score(1, 15),
-            "Code Quality & Engineering Maturity": mock_score(2, 25),
-            "Project Structure & Scalability": mock_score(3, 15),
-            "Git & Collaboration Signals": mock_score(4, 15),
-            "Testing & Reliability Mindset": mock_score(5, 10),
-            "Documentation & Communication": mock_score(6, 10),
-            "Professionalism Signals": mock_score(7, 10)
-        }
-        
-        # Recalculate score
-        score = min(sum(mock_breakdown.values()), 100)
-        
-        # Verdict
-        verdict = "Reject"
-        if score >= 85: verdict = "Strong Hire"
-        elif score >= 70: verdict = "Interview Recommended"
-        elif score >= 55: verdict = "Maybe / Screen"
-        elif score >= 40: verdict = "Weak"
-        
-        # Determine Level
-        level = "Advanced" if score > 70 else "Intermediate"
-            
-        # Select Deterministic Summary (Recruiter Style)
-        summaries_advanced = [
-            "The repository demonstrates solid engineering fundamentals with clean structure and readable code. A strong candidate for production roles.",
-            "Excellent codebase demonstrating solid architectural patterns. Highly recommended for technical interview.",
-            "Impressive project structure with good separation of concerns. Clear evidence of 'product thinking'."
-        ]
-        summaries_inter = [
-            "The project shows potential with good structure, but testing and CI practices are inconsistent. Worth a screening.",
-            "Solid functionality but lacks engineering maturity in error handling. Mentorship would be needed.",
-            "Good start, but the commit history suggests solo-coding habits. Verify team collaboration skills."
-        ]
-        summaries_begin = [
-            "The repository is a basic implementation. Lacks professional structure and testing. Not yet production-ready.",
-            "Functional code found, but file structure is cluttered. Recommended to focus on engineering best practices.",
-            "Early stage project. Focus on adding a README, tests, and basic error handling."
-        ]
-        
-        if score >= 70: summary = summaries_advanced[seed % len(summaries_advanced)]
-        elif score >= 40: summary = summaries_inter[seed % len(summaries_inter)]
-        else: summary = summaries_begin[seed % len(summaries_begin)]
-            
-        # Select Deterministic Roadmap
-        roadmap_options = [
-            "Add automated unit tests for core logic",
-            "Set up GitHub Actions for CI/CD",
-            "Improve README with 'Product Thinking' sections",
-            "Refactor monolithic functions to improve modularity",
-            "Adopt conventional commit messages",
-            "Externalize secrets to environment variables",
-            "Add a LICENSE and CONTRIBUTING guide",
-            "Handle edge cases and add error logging"
-        ]
-        
-        # Pick 3-4 random tasks
-        roadmap = []
-        num_tasks = (seed % 3) + 3 
-        for i in range(num_tasks):
-            idx = (seed + i) % len(roadmap_options)
-            roadmap.append(roadmap_options[idx])
-
-        mock_data = {
-            "repo_name": repo_name,
-            "owner": owner,
-            "score": score,
-            "level": level,
-            "verdict": verdict,
-            "breakdown": mock_breakdown,
-            "summary": f"AI Recruiter Evaluation (Fetch Fallback): {summary}",
-            "roadmap": roadmap,
-            "details": {
-                "code": {"complexity": (seed % 10) + 1, "has_tests": bool(seed % 2)},
-                "commits": {"good_commit_ratio": (seed % 100) / 100.0}
-            }
-        }
-        
-        return mock_data
+        metrics.analyses.inc("fetch_fallback")
+
+        # Unique, consistent results for ANY repo based on its URL hash
+        yield "result", await keep_result(fallback_result(url, FETCH_FAILED))
+        return
+
+    owner = repo_data.get("owner", {}).get("login") if isinstance(repo_data.get("owner"), dict) else repo_url.split('/')[-2]
+    yield "repo", {
+        "repo_name": repo_data["name"],
+        "owner": owner,
+        "stars": repo_data.get("stars"),
+        "forks": repo_data.get("forks"),
+        "languages": repo_data.get("languages"),
+        "default_branch": repo_data.get("default_branch"),
+    }
 
     # 2. Analyze
     try:
         # Try real analysis
-        code_metrics = analyze_code(repo_data)
-        commit_metrics = analyze_commits(repo_url)
-        score = calculate_score(code_metrics, commit_metrics, repo_data)
-        
-        # Get detailed breakdown
-        from app.scoring_engine import get_score_breakdown
-        breakdown = get_score_breakdown(code_metrics, commit_metrics, repo_data)
-        
-        level = get_level(score)
-        summary = generate_summary(repo_data, code_metrics, commit_metrics)
-        roadmap = generate_roadmap(score, code_metrics, commit_metrics)
-        
-    except Exception as e:
-        print(f"DEBUG: Analysis failed ({str(e)}), switching to FAIL-SAFE MOCK MODE", file=sys.stderr, flush=True)
-        
-        # 🛡️ DETERMINISTIC MOCK ENGINE 🛡️
-        # Generates unique, consistent results for ANY repo based on its name hash.
-        
-        import hashlib
-        
-        # Create a stable hash from the URL
-        hash_object = hashlib.md5(request.url.encode())
-        hex_dig = hash_object.hexdigest()
-        seed = int(hex_dig[:8], 16)
-        
-        repo_name = request.url.split('/')[-1].replace('.git', '')
-        owner = request.url.split('/')[-2] if len(request.url.split('/')) > 1 else "unknown"
-        
-        # Generate Score (skewed towards 60-95 for realism)
-        base_score = (seed % 65) + 30
-        if "pro" in repo_name or "ai" in repo_name or "api" in repo_name:
-            base_score += 5
-        score = min(98, base_score)
-        
-        # Generate Deterministic Breakdown (7 Categories - Recruiter Framework)
-        def mock_score(seed_offset, max_val, high_prob=False):
-            val = ((seed + seed_offset) % max_val) + 1
-            if high_prob: val = max(val, max_val - 2)
-            return val
-
-        mock_breakdown = {
-            "Problem & Product Thinking": mock_score(1, 15, score>70),
-            "Code Quality & Engineering Maturity": mock_score(2, 25, score>70),
-            "Project Structure & Scalability": mock_score(3, 15, score>70),
-            "Git & Collaboration Signals": mock_score(4, 15, score>60),
-            "Testing & Reliability Mindset": mock_score(5, 10, score>50),
-            "Documentation & Communication": mock_score(6, 10, score>70),
-            "Professionalism Signals": mock_score(7, 10, score>80)
-        }
-        
-        # Recalculate total score to be perfectly consistent with breakdown
-        score = sum(mock_breakdown.values())
-        score = min(100, score)
-
-        # Determine Verdict
-        verdict = "Reject"
-        if score >= 85: verdict = "Strong Hire"
-        elif score >= 70: verdict = "Interview Recommended"
-        elif score >= 55: verdict = "Maybe / Screen"
-        elif score >= 40: verdict = "Weak"
-
-        # Determine Level (Legacy)
-        level = "Beginner"
-        if score > 70: level = "Advanced"
-        elif score > 40: level = "Intermediate"
-            
-        # Select Deterministic Summary
-        summaries_advanced = [
-            "The repository demonstrates solid engineering fundamentals with clean structure and readable code. A strong candidate for production roles.",
-            "Excellent codebase demonstrating solid architectural patterns. Highly recommended for technical interview.",
-            "Impressive project structure with good separation of concerns. Clear evidence of 'product thinking'."
-        ]
-        summaries_inter = [
-            "The project shows potential with good structure, but testing and CI practices are inconsistent. Worth a screening.",
-            "Solid functionality but lacks engineering maturity in error handling. Mentorship would be needed.",
-            "Good start, but the commit history suggests solo-coding habits. Verify team collaboration skills."
-        ]
-        summaries_begin = [
-            "The repository is a basic implementation. Lacks professional structure and testing. Not yet production-ready.",
-            "Functional code found, but file structure is cluttered. Recommended to focus on engineering best practices.",
-            "Early stage project. Focus on adding a README, tests, and basic error handling."
-        ]
-        
-        if score >= 70: summary = summaries_advanced[seed % len(summaries_advanced)]
-        elif score >= 40: summary = summaries_inter[seed % len(summaries_inter)]
-        else: summary = summaries_begin[seed % len(summaries_begin)]
-            
-        # Select Deterministic Roadmap
-        roadmap_options = [
-            "Add automated unit tests for core logic",
-            "Set up GitHub Actions for CI/CD",
-            "Improve README with 'Product Thinking' sections",
-            "Refactor monolithic functions to improve modularity",
-            "Adopt conventional commit messages",
-            "Externalize secrets to environment variables",
-            "Add a LICENSE and CONTRIBUTING guide",
-            "Handle edge cases and add error logging"
-        ]
-        
-        roadmap = []
-        num_tasks = (seed % 3) + 3 
-        for i in range(num_tasks):
-            idx = (seed + i) % len(roadmap_options)
-            roadmap.append(roadmap_options[idx])
-
-        return {
-            "repo_name": repo_name,
-            "owner": owner,
-            "score": score,
-            "level": level,
-            "verdict": verdict,
-            "breakdown": mock_breakdown,
-            "summary": f"AI Recruiter Evaluation: {summary}",
-            "roadmap": roadmap,
-            "details": {
-                "code": {"complexity": (seed % 10) + 1, "has_tests": bool(seed % 2)},
-                "commits": {"good_commit_ratio": (seed % 100) / 100.0}
-            }
-        }
-    
-    # 2. Analyze
-    try:
-        # Try real analysis
-        code_metrics = analyze_code(repo_data)
-        commit_metrics = analyze_commits(repo_url)
-        score = calculate_score(code_metrics, commit_metrics, repo_data)
-        
-        # Get detailed breakdown
-        from app.scoring_engine import get_score_breakdown, get_verdict
-        breakdown = get_score_breakdown(code_metrics, commit_metrics, repo_data)
-        verdict = get_verdict(score)
-        level = "Intermediate" # Fallback or calc
-        if score > 70: level = "Advanced"
-        elif score < 40: level = "Beginner"
-        
-        summary = generate_summary(repo_data, code_metrics, commit_metrics)
-        roadmap = generate_roadmap(score, code_metrics, commit_metrics)
+        # radon is CPU-bound, keep it off the event loop
+        with metrics.timed("code"):
+            code_metrics = await run_in_threadpool(analyze_code, repo_data, ctx)
+        yield "code", code_metrics
+        with metrics.timed("commits"):
+            commit_metrics = await analyze_commits(ctx, repo_data)
+        yield "commits", commit_metrics
+
+        with metrics.timed("score"):
+            score = calculate_score(code_metrics, commit_metrics, repo_data)
+
+            # Get detailed breakdown
+            from app.scoring_engine import get_score_breakdown, get_verdict
+            breakdown = get_score_breakdown(code_metrics, commit_metrics, repo_data)
+            verdict = get_verdict(score)
+            level = "Intermediate" # Fallback or calc
+            if score > 70: level = "Advanced"
+            elif score < 40: level = "Beginner"
+        yield "breakdown", {"score": score, "level": level, "verdict": verdict, "breakdown": breakdown}
+
+        # Roadmap is rule-based and instant, the summary may wait on the LLM
+        with metrics.timed("roadmap"):
+            roadmap = generate_roadmap(score, code_metrics, commit_metrics)
+        yield "roadmap", roadmap
+        with metrics.timed("summary"):
+            summary = await generate_summary_async(repo_data, code_metrics, commit_metrics)
+        yield "summary", summary
         
     except Exception as e:
+        if not fallback:
+            raise
         print(f"DEBUG: Analysis failed ({str(e)}), switching to FAIL-SAFE MOCK MODE", file=sys.stderr, flush=True)
-        # 🛡️ DETERMINISTIC MOCK ENGINE (Fallback for Analysis Failure)
-        import hashlib
-        
-        # Create a stable hash from the URL
-        hash_object = hashlib.md5(repo_url.encode())
-        hex_dig = hash_object.hexdigest()
-        seed = int(hex_dig[:8], 16)
-        
-        repo_name = repo_url.split('/')[-1].replace('.git', '')
-        owner = repo_url.split('/')[-2] if len(repo_url.split('/')) > 1 else "unknown"
-        
-        # Base Score Generation
-        base_score = (seed % 40) + 45 # Range 45-84 roughly
-        if "pro" in repo_name or "ai" in repo_name:
-            base_score += 10
-        score = min(98, base_score)
-
-        # Mock Breakdown (7 Categories)
-        def mock_score(seed_offset, max_val):
-            return ((seed + seed_offset) % max_val) + 1
-
-        mock_breakdown = {
-            "Problem & Product Thinking": mock_score(1, 15),
-            "Code Quality & Engineering Maturity": mock_score(2, 25),
-            "Project Structure & Scalability": mock_score(3, 15),
-            "Git & Collaboration Signals": mock_score(4, 15),
-            "Testing & Reliability Mindset": mock_score(5, 10),
-            "Documentation & Communication": mock_score(6, 10),
-            "Professionalism Signals": mock_score(7, 10)
-        }
-        
-        # Recalculate score from breakdown
-        score = min(sum(mock_breakdown.values()), 100)
-        
-        # Verdict
-        verdict = "Reject"
-        if score >= 85: verdict = "Strong Hire"
-        elif score >= 70: verdict = "Interview Recommended"
-        elif score >= 55: verdict = "Maybe / Screen"
-        elif score >= 40: verdict = "Weak"
-        
-        return {
-            "repo_name": repo_name,
-            "owner": owner,
-            "score": score,
-            "level": "Advanced" if score > 70 else "Intermediate",
-            "verdict": verdict,
-            "breakdown": mock_breakdown,
-            "summary": "AI Recruiter Evaluation (Analysis Fallback): This repository shows potential but we encountered an error fully analyzing it. Based on surface signals, the project appears to be a solid implementation.",
-            "roadmap": ["Add automated tests", "Setup CI/CD", "Improve README"],
-            "details": {
-                "code": {"complexity": 10, "has_tests": True},
-                "commits": {"good_commit_ratio": 0.8}
-            }
-        }
+        metrics.analyses.inc("analysis_fallback")
 
+        yield "result", await keep_result(fallback_result(url, ANALYSIS_FAILED))
+        return
+    
     # 4. Generate PDF
-    return {
+    result = {
         "repo_name": repo_data["name"],
-        "owner": repo_data.get("owner", {}).get("login") if isinstance(repo_data.get("owner"), dict) else repo_url.split('/')[-2],
+        "owner": owner,
         "score": score,
         "level": level,
         "verdict": verdict,
@@ -375,6 +224,290 @@ def analyze_repo_endpoint(request: AnalyzeRequest):
             "commits": commit_metrics
         }
     }
+    if previous:
+        result["changes"] = describe_changes(previous, repo_data, result)
+    result = await keep_result(result)
+    degraded = repo_data.get("degraded")
+    if degraded:
+        # A failed GitHub call left part of the grade out: answer with it, but don't
+        # serve it for this commit all day or base the next incremental run on it
+        print(f"DEBUG: Partial data ({', '.join(degraded)}), not caching the result", file=sys.stderr, flush=True)
+        metrics.analyses.inc("partial")
+    else:
+        await save_state(ctx, head_sha, repo_data, result)
+        if cache_key:
+            await result_cache.put_async(cache_key, result)
+        metrics.analyses.inc("analyzed")
+    yield "result", result
+
+async def run_analysis(url: str, fallback: bool = True, feed: Feed = None) -> dict:
+    """
+    Runs the pipeline to completion and returns the response dict. Each
+    (stage, payload) is also published to `feed` as soon as it's ready.
+    """
+    result = None
+    error = None
+    try:
+        async for stage, payload in analysis_stages(url, fallback):
+            if feed is not None:
+                feed.publish((stage, payload))
+            if stage == "result":
+                result = payload
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if feed is not None:
+            feed.close(error)
+    return result
+
+def flight_key(url: str, fallback: bool):
+    try:
+        return (repo_key(url), fallback)
+    except ValueError:
+        return None
+
+def analysis_flight(url: str, fallback: bool):
+    """
+    (task, feed) of the run analyzing url's owner/repo: the one in flight, or
+    a new one. The feed carries its stages for stream requests.
+    """
+    key = flight_key(url, fallback)
+
+    def start():
+        feed = stage_feeds[key] = Feed()
+        return run_analysis(url, fallback, feed)
+
+    task = analyses_in_flight.start(key, start)
+    feed = stage_feeds[key]
+    # After SingleFlight's own callback, so a run that is still joinable always has its feed
+    task.add_done_callback(lambda done: stage_feeds.pop(key) if stage_feeds.get(key) is feed else None)
+    return task, feed
+
+async def analyze_repo(url: str, fallback: bool = True) -> dict:
+    """
+    run_analysis, coalesced: requests for an owner/repo that is already being
+    analyzed wait for that run instead of starting their own.
+    """
+    if flight_key(url, fallback) is None:
+        return await run_analysis(url, fallback)
+    task, _ = analysis_flight(url, fallback)
+    # A caller that goes away stops waiting, the run goes on for the others
+    return await asyncio.shield(task)
+
+@app.post("/analyze")
+@app.post("/api/analyze")
+async def analyze_repo_endpoint(request: AnalyzeRequest):
+    return await analyze_repo(request.url)
+
+def stage_frame(stage: str, payload, sse: bool) -> str:
+    # NDJSON: one {"stage", "data"} object per line. SSE: the stage is the event name.
+    if sse:
+        return f"event: {stage}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"stage": stage, "data": payload}) + "\n"
+
+async def stream_stages(url: str, sse: bool):
+    try:
+        if flight_key(url, True) is None:
+            stages = analysis_stages(url)
+        else:
+            # The same coalesced run as /analyze: joiners get the stages so far, then the rest live
+            _, feed = analysis_flight(url, True)
+            stages = feed.follow()
+        async for stage, payload in stages:
+            yield stage_frame(stage, payload, sse)
+    except Exception as e:
+        print(f"Stream failed for {url}: {str(e)}")
+        yield stage_frame("error", {"error": str(e)}, sse)
+
+@app.post("/analyze/stream")
+@app.post("/api/analyze/stream")
+async def analyze_stream_endpoint(request: AnalyzeRequest, http_request: Request, format: str = None):
+    # Same pipeline as /analyze, but each stage is sent as soon as it's ready so the
+    # UI can render repo info and metrics while the AI summary is still generating.
+    # NDJSON by default; Server-Sent Events with ?format=sse or Accept: text/event-stream.
+    sse = format == "sse" or (format is None and "text/event-stream" in http_request.headers.get("accept", ""))
+    return StreamingResponse(
+        stream_stages(request.url, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        # Keep proxies (nginx, Vercel) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/analyze/batch")
+@app.post("/api/analyze/batch")
+async def analyze_batch_endpoint(request: BatchAnalyzeRequest):
+    # One NDJSON line per unique repo, streamed as each analysis completes.
+    # Failures are reported per item instead of being masked by the mock engine.
+    if len(request.urls) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} repositories per batch")
+    return StreamingResponse(
+        run_batch(request.urls, lambda url: analyze_repo(url, fallback=False)),
+        media_type="application/x-ndjson",
+    )
+
+async def analyze_job(payload: dict):
+    return await analyze_repo(payload["url"])
+
+async def pdf_job(payload: dict):
+    # Rendered into the report cache; the job result just points at it
+    result = await store_result({
+        "repo_name": payload["repo"],
+        "score": payload["score"],
+        "summary": payload["summary"],
+        "roadmap": payload["roadmap"],
+    })
+    await report_pdf(result)
+    return {"analysis_id": result["analysis_id"], "download": f"/api/reports/{result['analysis_id']}/pdf"}
+
+jobs.register("analyze", analyze_job)
+jobs.register("pdf", pdf_job)
+
+@app.on_event("startup")
+async def start_job_workers():
+    jobs.start_workers()
+
+@app.on_event("startup")
+async def start_warmup():
+    warmup.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await jobs.stop_workers()
+
+@app.post("/jobs", status_code=202)
+@app.post("/api/jobs", status_code=202)
+async def submit_job_endpoint(request: JobRequest):
+    # Long analyses and PDF rendering run in the background; poll GET /api/jobs/{id}
+    # instead of holding the connection open past load balancer timeouts.
+    if request.type == "analyze":
+        if not request.url:
+            raise HTTPException(status_code=400, detail="analyze jobs need a url")
+        payload = {"url": request.url}
+    elif request.type == "pdf":
+        if not request.repo or request.score is None:
+            raise HTTPException(status_code=400, detail="pdf jobs need repo and score")
+        payload = {"repo": request.repo, "score": request.score, "summary": request.summary or "", "roadmap": request.roadmap or []}
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown job type: {request.type}")
+    job_id = await jobs.submit(request.type, payload)
+    return {"id": job_id, "type": request.type, "status": jobs.QUEUED}
+
+@app.get("/jobs/{job_id}")
+@app.get("/api/jobs/{job_id}")
+def get_job_endpoint(job_id: str):
+    job = jobs.queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "id": job["id"],
+        "type": job["type"],
+        "status": job["status"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+
+@app.get("/jobs/{job_id}/pdf")
+@app.get("/api/jobs/{job_id}/pdf")
+async def download_job_pdf_endpoint(job_id: str):
+    job = await asyncio.to_thread(jobs.queue.get, job_id)
+    if job is None or job["type"] != "pdf":
+        raise HTTPException(status_code=404, detail="PDF job not found")
+    if job["status"] != jobs.DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    result = await load_result(job["result"]["analysis_id"])
+    if result is None:
+        raise HTTPException(status_code=410, detail="Report expired, submit the job again")
+    return pdf_response(await report_pdf(result), report_filename(result["repo_name"]))
+
+@app.get("/warmup")
+@app.get("/api/warmup")
+async def warmup_endpoint(wait: float = 0):
+    # For readiness probes / cron pings: starts the warm-up if this process
+    # hasn't yet, and with ?wait=N holds the response until it is done (or N seconds pass)
+    warmup.start()
+    if wait > 0 and warmup.status()["started"]:
+        await warmup.wait(min(wait, 60))
+    return warmup.status()
+
+@app.get("/metrics")
+@app.get("/api/metrics")
+def metrics_endpoint():
+    # Prometheus scrape target: stage timings, GitHub calls, cache hits, fallbacks, LLM latency
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/rate-limit")
+@app.get("/api/rate-limit")
+def rate_limit_endpoint():
+    # Remaining GitHub budget per pooled token (only the last 4 chars are shown)
+    return {"tokens": github_scheduler.status()}
+
+def content_disposition(filename: str) -> str:
+    """
+    `attachment` header for a download, like Starlette's FileResponse builds it:
+    names that aren't plain ASCII (headers are latin-1, and a quote would end
+    the value) also go in an RFC 5987 filename*, with an ASCII fallback.
+    """
+    if quote(filename) == filename:
+        return f'attachment; filename="{filename}"'
+    fallback = "".join(c if " " <= c <= "~" and c not in '"\\' else "_" for c in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=utf-8''{quote(filename)}"
+
+def pdf_response(data: bytes, filename: str, headers: dict = None, media_type: str = "application/pdf"):
+    # Rendered in memory and streamed straight back; nothing is written under pdfs/
+    def chunks():
+        view = memoryview(data)
+        for start in range(0, len(view), 64 * 1024):
+            yield bytes(view[start:start + 64 * 1024])
+
+    return StreamingResponse(
+        chunks(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": content_disposition(filename),
+            "Content-Length": str(len(data)),
+            **(headers or {}),
+        },
+    )
+
+@app.get("/reports/{analysis_id}/pdf")
+@app.get("/api/reports/{analysis_id}/pdf")
+async def report_pdf_endpoint(analysis_id: str):
+    # Renders from the stored analysis, so nothing has to travel in the query string
+    result = await load_result(analysis_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Analysis not found or expired, analyze the repository again")
+    pdf = await report_pdf(result)
+    return pdf_response(
+        pdf,
+        report_filename(result["repo_name"]),
+        # The ID is a content hash: the same ID always means the same report
+        {"ETag": f'"{analysis_id}"', "Cache-Control": "private, max-age=86400"},
+    )
+
+@app.post("/reports/export")
+@app.post("/api/reports/export")
+async def export_reports_endpoint(request: ExportRequest):
+    # Bulk export for a cohort (e.g. the analysis_ids of a batch run), rendered
+    # on a worker process so it doesn't stall other requests.
+    if request.format not in ("pdf", "zip"):
+        raise HTTPException(status_code=400, detail="format must be 'pdf' or 'zip'")
+    if not request.analysis_ids:
+        raise HTTPException(status_code=400, detail="No analysis_ids given")
+    if len(request.analysis_ids) > REPORT_EXPORT_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {REPORT_EXPORT_MAX_ITEMS} reports per export")
+    results = await load_results(request.analysis_ids)
+    missing = [a for a, r in zip(request.analysis_ids, results) if r is None]
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Analyses not found or expired", "missing": missing})
+
+    data = await export_reports(results, request.format)
+    if request.format == "zip":
+        return pdf_response(data, "GitGrade_Cohort_Reports.zip", media_type="application/zip")
+    return pdf_response(data, "GitGrade_Cohort_Report.pdf")
 
 @app.get("/download-pdf")
 @app.get("/api/download-pdf")
@@ -387,8 +520,10 @@ def download_pdf_endpoint(repo: str, score: int, summary: str, roadmap: str):
     # Let's parse roadmap list from string (comma sep) for this simple demo
     roadmap_list = roadmap.split(',')
     
-    path = generate_pdf(repo, score, summary, roadmap_list)
-    return FileResponse(path, media_type='application/pdf', filename=os.path.basename(path))
+    with metrics.timed("pdf"):
+        pdf = render_pdf(repo, score, summary, roadmap_list)
+    return pdf_response(pdf, report_filename(repo))
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
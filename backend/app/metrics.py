@@ -0,0 +1,160 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# In-process counters and timing histograms, served in the Prometheus text format
+# on GET /api/metrics. Every server process keeps its own (scrape each one, or
+# sum them in the query); they reset on restart, which Prometheus handles.
+# Add a Server-Timing header (per-stage timings of the request) to API responses,
+# visible in the browser's network panel. Off by default: it shows internals.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+# Seconds; GitHub fetches of big repos and LLM calls live in the upper buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_metrics = {}
+# The stage timings of the request being handled, for its Server-Timing header
+_request_timings = contextvars.ContextVar("gitgrade_request_timings", default=None)
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        with _lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        with _lock:
+            return self._values.get(label_values, 0)
+
+    def _samples(self):
+        for label_values, value in sorted(self._values.items()):
+            yield self.name, _labels(self.labels, label_values), value
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [bucket counts..., sum, count]
+        self._values = {}
+
+    def observe(self, seconds: float, *label_values):
+        with _lock:
+            values = self._values.get(label_values)
+            if values is None:
+                values = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    values[i] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def count(self, *label_values) -> int:
+        with _lock:
+            values = self._values.get(label_values)
+            return values[-1] if values else 0
+
+    def _samples(self):
+        for label_values, values in sorted(self._values.items()):
+            for bound, bucket_count in zip(self.buckets, values):
+                yield f"{self.name}_bucket", _labels(self.labels + ("le",), label_values + (str(bound),)), bucket_count
+            yield f"{self.name}_bucket", _labels(self.labels + ("le",), label_values + ("+Inf",)), values[-1]
+            yield f"{self.name}_sum", _labels(self.labels, label_values), values[-2]
+            yield f"{self.name}_count", _labels(self.labels, label_values), values[-1]
+
+def _register(metric):
+    _metrics[metric.name] = metric
+    return metric
+
+def counter(name: str, help: str, labels: tuple = ()) -> Counter:
+    return _register(Counter(name, help, labels))
+
+def histogram(name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labels, buckets))
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+# --- The metrics the app records ---
+stage_seconds = histogram(
+    "gitgrade_stage_seconds",
+    "Time spent in each analysis pipeline stage.",
+    ("stage",),
+)
+analyses = counter(
+    "gitgrade_analyses_total",
+    "Analyses answered, by how: analyzed, partial (not cached), cached (unchanged repo) or a mock-engine fallback.",
+    ("outcome",),
+)
+github_requests = counter(
+    "gitgrade_github_requests_total",
+    "GitHub API calls made, by rate-limit resource and HTTP status.",
+    ("resource", "status"),
+)
+cache_lookups = counter(
+    "gitgrade_cache_lookups_total",
+    "Cache reads by cache and result (hit or miss).",
+    ("cache", "result"),
+)
+llm_seconds = histogram(
+    "gitgrade_llm_seconds",
+    "LLM completion latency, by outcome (ok or error; timeouts count as error).",
+    ("outcome",),
+)
+
+@contextmanager
+def timed(stage: str):
+    """
+    Times the block as one pipeline stage: recorded in gitgrade_stage_seconds
+    and, when the request is collecting them, in its Server-Timing header.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+def collect_request_timings() -> list:
+    """
+    Starts collecting stage timings for the current request; returns the list
+    timed() appends (stage, seconds) to.
+    """
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+def server_timing(timings: list) -> str:
+    # Server-Timing: stage;dur=<ms>, ... (a stage that ran twice appears twice)
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings)
+
+def render() -> str:
+    """
+    Every metric in the Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    with _lock:
+        for metric in _metrics.values():
+            kind = "histogram" if isinstance(metric, Histogram) else "counter"
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            for name, labels, value in metric._samples():
+                lines.append(f"{name}{labels} {value}")
+    return "\n".join(lines) + "\n"
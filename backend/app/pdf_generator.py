@@ -1,67 +1,140 @@
 from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-import os
+import io
 import textwrap
+import zipfile
 
-def generate_pdf(repo: str, score: int, summary: str, roadmap: list):
+# Page setup shared by every report drawn in this process (reportlab's base
+# fonts need no registration, so a report only costs its own drawing calls).
+PAGE_WIDTH, PAGE_HEIGHT = A4
+TITLE_FONT = ("Helvetica-Bold", 22)
+HEADING_FONT = ("Helvetica-Bold", 12)
+SCORE_FONT = ("Helvetica-Bold", 14)
+BODY_FONT = ("Helvetica", 11)
+REPO_FONT = ("Helvetica", 12)
+TITLE_COLOR = (0.1, 0.1, 0.4) # Dark Blue
+TEXT_COLOR = (0, 0, 0) # Black
+_wrapper = textwrap.TextWrapper(width=80)
+
+def _canvas(buffer):
+    # The canvas machinery is most of reportlab's import cost; reports are rare,
+    # so it's only loaded when the first one is drawn
+    from reportlab.pdfgen import canvas
+    return canvas.Canvas(buffer, pagesize=A4)
+
+def report_filename(repo: str) -> str:
     filename = f"{repo}_GitGrade_Report.pdf"
-    safe_filename = filename.replace("/", "_")
-    
-    path = os.path.join("pdfs", safe_filename)
-    os.makedirs("pdfs", exist_ok=True)
-    
-    c = canvas.Canvas(path, pagesize=A4)
-    width, height = A4
-    
+    return filename.replace("/", "_")
+
+def render_pdf(repo: str, score: int, summary: str, roadmap: list) -> bytes:
+    """
+    Renders one report into memory and returns the PDF bytes.
+    """
+    buffer = io.BytesIO()
+    c = _canvas(buffer)
+    _draw_report(c, repo, score, summary, roadmap)
+    c.save()
+    return buffer.getvalue()
+
+def render_cohort_pdf(reports: list) -> bytes:
+    """
+    One PDF for a whole batch: an overview page listing every repository and
+    its score, then each report as its own section (with a bookmark).
+    `reports` are analysis results (repo_name, score, summary, roadmap, level).
+    """
+    buffer = io.BytesIO()
+    c = _canvas(buffer)
+
+    c.setFillColorRGB(*TITLE_COLOR)
+    c.setFont(*TITLE_FONT)
+    c.drawString(50, PAGE_HEIGHT - 60, "GitGrade AI Cohort Report")
+    c.setFillColorRGB(*TEXT_COLOR)
+    c.setFont(*BODY_FONT)
+    current_y = PAGE_HEIGHT - 100
+    for report in reports:
+        level = f" ({report['level']})" if report.get("level") else ""
+        c.drawString(50, current_y, f"{report['repo_name']}: {report['score']}/100{level}")
+        current_y -= 18
+        if current_y < 50:
+            c.showPage()
+            c.setFont(*BODY_FONT)
+            current_y = PAGE_HEIGHT - 50
+    c.showPage()
+
+    for index, report in enumerate(reports):
+        key = f"report-{index}"
+        c.bookmarkPage(key)
+        c.addOutlineEntry(f"{report['repo_name']} ({report['score']}/100)", key)
+        _draw_report(c, report["repo_name"], report["score"], report["summary"], report["roadmap"])
+        c.showPage()
+
+    c.save()
+    return buffer.getvalue()
+
+def render_report_zip(reports: list) -> bytes:
+    """
+    A zip with one PDF per report, named like the single-report downloads.
+    """
+    buffer = io.BytesIO()
+    used = set()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for report in reports:
+            name = report_filename(report["repo_name"])
+            # Same repo name from two owners: keep both
+            if name in used:
+                name = report_filename(f"{report.get('owner') or len(used)}_{report['repo_name']}")
+            used.add(name)
+            archive.writestr(name, render_pdf(report["repo_name"], report["score"], report["summary"], report["roadmap"]))
+    return buffer.getvalue()
+
+def _draw_report(c, repo: str, score: int, summary: str, roadmap: list):
+    width, height = PAGE_WIDTH, PAGE_HEIGHT
+
     # --- Header ---
-    c.setFillColorRGB(0.1, 0.1, 0.4) # Dark Blue
-    c.setFont("Helvetica-Bold", 22)
+    c.setFillColorRGB(*TITLE_COLOR)
+    c.setFont(*TITLE_FONT)
     c.drawString(50, height - 60, "GitGrade AI Report")
-    
-    c.setFillColorRGB(0, 0, 0) # Black
-    c.setFont("Helvetica", 12)
+
+    c.setFillColorRGB(*TEXT_COLOR)
+    c.setFont(*REPO_FONT)
     c.drawString(50, height - 90, f"Repository: {repo}")
-    
+
     # --- Score Badge ---
-    c.setFont("Helvetica-Bold", 14)
+    c.setFont(*SCORE_FONT)
     c.drawString(50, height - 120, f"Overall Score: {score}/100")
-    
+
     # --- Summary Section ---
-    c.setFont("Helvetica-Bold", 12)
+    c.setFont(*HEADING_FONT)
     c.drawString(50, height - 160, "Recruiter Summary:")
-    
-    c.setFont("Helvetica", 11)
+
+    c.setFont(*BODY_FONT)
     text = c.beginText(50, height - 180)
-    
+
     # Wrap summary text
-    wrapper = textwrap.TextWrapper(width=80) 
-    wrapped_summary = wrapper.wrap(text=summary)
-    
+    wrapped_summary = _wrapper.wrap(text=summary)
+
     for line in wrapped_summary:
         text.textLine(line)
-    
+
     c.drawText(text)
-    
+
     # --- Roadmap Section ---
     # Calculate Y position based on summary length
     current_y = height - 180 - (len(wrapped_summary) * 15) - 40
-    
-    c.setFont("Helvetica-Bold", 12)
+
+    c.setFont(*HEADING_FONT)
     c.drawString(50, current_y, "Personalized Roadmap:")
     current_y -= 25
-    
-    c.setFont("Helvetica", 11)
+
+    c.setFont(*BODY_FONT)
     for step in roadmap:
         # Wrap roadmap items too
-        wrapped_step = wrapper.wrap(f"- {step}")
+        wrapped_step = _wrapper.wrap(f"- {step}")
         for line in wrapped_step:
             c.drawString(60, current_y, line)
             current_y -= 15
         current_y -= 5 # Space between items
-        
+
         if current_y < 50: # New Page if simplified
             c.showPage()
+            c.setFont(*BODY_FONT)
             current_y = height - 50
-
-    c.save()
-    return path
@@ -0,0 +1,227 @@
+import asyncio
+import os
+import threading
+import time
+
+# Comma-separated GitHub tokens, each optionally weighted as "token:weight"
+# (e.g. an org token that should take 3x the traffic). Falls back to GITHUB_TOKEN.
+GITHUB_TOKENS_ENV = "GITHUB_TOKENS"
+# Calls left unused on each token; below this a token is skipped and, if every
+# token is that low, requests wait for a reset instead of failing.
+GITHUB_RATE_LIMIT_FLOOR = int(os.getenv("GITHUB_RATE_LIMIT_FLOOR", "10"))
+# Longest a request queues for budget before giving up.
+GITHUB_RATE_LIMIT_MAX_WAIT = float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", "120"))
+# How often queued requests re-check the budget.
+GITHUB_RATE_LIMIT_POLL = float(os.getenv("GITHUB_RATE_LIMIT_POLL", "0.25"))
+
+class RateLimitExhausted(Exception):
+    def __init__(self, resource: str, reset: float):
+        super().__init__(f"GitHub {resource} rate limit exhausted on every token, resets at {int(reset)}")
+        self.resource = resource
+        self.reset = reset
+
+class Token:
+    """
+    One credential of the pool (value None = unauthenticated) and the budget
+    GitHub last reported for it, per resource ("core", "graphql", "search", ...).
+    """
+
+    def __init__(self, value, weight: int = 1):
+        self.value = value
+        self.weight = max(1, weight)
+        self.label = f"...{value[-4:]}" if value else "anonymous"
+        self.budgets = {}
+        self.in_flight = {}
+        # Smooth weighted round-robin state
+        self.current_weight = 0
+
+    def available(self, resource: str, now: float):
+        """
+        Calls this token can still make for `resource` (None when unknown),
+        minus what's in flight.
+        """
+        budget = self.budgets.get(resource)
+        if budget is None or now >= budget["reset"]:
+            return None
+        return budget["remaining"] - self.in_flight.get(resource, 0)
+
+def parse_tokens(raw: str) -> list:
+    tokens = []
+    for item in (raw or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        value, _, weight = item.partition(":")
+        tokens.append(Token(value.strip(), int(weight) if weight.strip().isdigit() else 1))
+    return tokens
+
+class TokenScheduler:
+    """
+    Hands out GitHub tokens for requests: weighted round-robin over the tokens
+    that still have budget for the resource, tracking X-RateLimit-* from every
+    response. When all of them are low, acquire() waits for the earliest reset
+    (up to GITHUB_RATE_LIMIT_MAX_WAIT) rather than letting the call fail.
+    Thread-safe; usable from the event loop (acquire) and worker threads (acquire_sync).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._config = None
+        self.tokens = []
+
+    def _load(self):
+        # Re-read the environment so a changed token list takes effect without a restart
+        raw = os.getenv(GITHUB_TOKENS_ENV) or os.getenv("GITHUB_TOKEN") or ""
+        if raw != self._config:
+            self._config = raw
+            self.tokens = parse_tokens(raw) or [Token(None)]
+
+    def has_token(self) -> bool:
+        with self._lock:
+            self._load()
+            return any(t.value for t in self.tokens)
+
+    def _pick(self, resource: str, now: float):
+        """
+        Returns (token, 0) with a call reserved on it, or (None, seconds to wait).
+        """
+        with self._lock:
+            self._load()
+            eligible = []
+            wait = None
+            for token in self.tokens:
+                if resource == "graphql" and token.value is None:
+                    continue
+                left = token.available(resource, now)
+                if left is None or left > GITHUB_RATE_LIMIT_FLOOR:
+                    eligible.append(token)
+                else:
+                    budget = token.budgets[resource]
+                    # Only in-flight reservations hold it back: they'll settle shortly
+                    until = 0 if budget["remaining"] > GITHUB_RATE_LIMIT_FLOOR else budget["reset"] - now
+                    wait = until if wait is None else min(wait, until)
+            if not eligible and wait is None:
+                raise RuntimeError(f"GitHub {resource} API needs a token")
+            if not eligible:
+                return None, max(wait, 0)
+
+            total = sum(t.weight for t in eligible)
+            for token in eligible:
+                token.current_weight += token.weight
+            chosen = max(eligible, key=lambda t: t.current_weight)
+            chosen.current_weight -= total
+            chosen.in_flight[resource] = chosen.in_flight.get(resource, 0) + 1
+            return chosen, 0
+
+    def _next_pause(self, resource: str, waited: float, wait: float) -> float:
+        if wait > GITHUB_RATE_LIMIT_MAX_WAIT - waited:
+            # Not worth queueing: the budget won't come back in time
+            raise RateLimitExhausted(resource, time.time() + wait)
+        return min(wait, GITHUB_RATE_LIMIT_POLL) or GITHUB_RATE_LIMIT_POLL
+
+    async def acquire(self, resource: str = "core") -> Token:
+        """
+        Reserves a call for `resource` on the next token in rotation, queueing
+        while every token is low. Pair with release().
+        """
+        waited = 0.0
+        while True:
+            token, wait = self._pick(resource, time.time())
+            if token is not None:
+                return token
+            pause = self._next_pause(resource, waited, wait)
+            await asyncio.sleep(pause)
+            waited += pause
+
+    def acquire_sync(self, resource: str = "core") -> Token:
+        waited = 0.0
+        while True:
+            token, wait = self._pick(resource, time.time())
+            if token is not None:
+                return token
+            pause = self._next_pause(resource, waited, wait)
+            time.sleep(pause)
+            waited += pause
+
+    def release(self, token: Token, resource: str, response=None):
+        """
+        Returns the reserved call and records the budget reported by `response`
+        (None when the request never got an answer).
+        """
+        with self._lock:
+            token.in_flight[resource] = max(0, token.in_flight.get(resource, 0) - 1)
+            if response is None:
+                return
+            headers = response.headers
+            remaining = headers.get("x-ratelimit-remaining")
+            actual = headers.get("x-ratelimit-resource", resource)
+            if remaining is not None:
+                token.budgets[actual] = {
+                    "limit": int(headers.get("x-ratelimit-limit", 0)),
+                    "remaining": int(remaining),
+                    "reset": int(headers.get("x-ratelimit-reset", 0)),
+                }
+            retry_after = headers.get("retry-after")
+            if is_rate_limited(response) and retry_after and retry_after.isdigit():
+                # Secondary (abuse) limit: bench the token until GitHub says so
+                budget = token.budgets.setdefault(actual, {"limit": 0, "remaining": 0, "reset": 0})
+                budget["remaining"] = 0
+                budget["reset"] = max(budget["reset"], int(time.time()) + int(retry_after))
+
+    def status(self, resource: str = None) -> list:
+        """
+        Current budget per token: [{"token", "weight", "in_flight", "budgets"}].
+        Token values are never exposed, only their last four characters.
+        """
+        now = time.time()
+        with self._lock:
+            self._load()
+            report = []
+            for token in self.tokens:
+                budgets = {
+                    name: dict(budget)
+                    for name, budget in token.budgets.items()
+                    if (resource is None or name == resource) and now < budget["reset"]
+                }
+                report.append({
+                    "token": token.label,
+                    "weight": token.weight,
+                    "in_flight": sum(token.in_flight.values()),
+                    "budgets": budgets,
+                })
+            return report
+
+    def combined(self, resource: str = "core"):
+        """
+        The pool's budget for `resource` as one {"limit", "remaining", "reset"},
+        or None while no token has reported one yet. Tokens that haven't
+        reported (or whose window reset) are assumed to have a full limit.
+        """
+        now = time.time()
+        with self._lock:
+            self._load()
+            known = []
+            unknown = 0
+            for token in self.tokens:
+                budget = token.budgets.get(resource)
+                if budget is not None and now < budget["reset"]:
+                    known.append(budget)
+                else:
+                    unknown += 1
+            if not known:
+                return None
+            full = max(b["limit"] for b in known)
+            return {
+                "limit": sum(b["limit"] for b in known) + unknown * full,
+                "remaining": sum(b["remaining"] for b in known) + unknown * full,
+                "reset": max(b["reset"] for b in known),
+            }
+
+def is_rate_limited(response) -> bool:
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        response.headers.get("x-ratelimit-remaining") == "0" or "retry-after" in response.headers
+    )
+
+scheduler = TokenScheduler()
@@ -0,0 +1,83 @@
+import io
+import os
+import posixpath
+import tarfile
+
+# Per-file and per-archive caps on the Python source bytes we hand to radon.
+ARCHIVE_MAX_FILE_BYTES = int(os.getenv("ARCHIVE_MAX_FILE_BYTES", str(512 * 1024)))
+ARCHIVE_MAX_TOTAL_BYTES = int(os.getenv("ARCHIVE_MAX_TOTAL_BYTES", str(64 * 1024 * 1024)))
+
+# Third-party code checked into a repo says nothing about its author.
+VENDORED_DIRS = {
+    "node_modules", "vendor", "vendored", "third_party", "site-packages",
+    "venv", ".venv", "env", "build", "dist", ".tox", "__pycache__",
+}
+SOURCE_EXTENSIONS = (".py",)
+
+def is_analyzable(path: str, size: int) -> bool:
+    """
+    True for Python sources we want complexity for: right extension,
+    not vendored, not larger than ARCHIVE_MAX_FILE_BYTES.
+    """
+    if not path.endswith(SOURCE_EXTENSIONS) or size > ARCHIVE_MAX_FILE_BYTES:
+        return False
+    return not any(part in VENDORED_DIRS for part in posixpath.dirname(path).split("/"))
+
+class ChunkReader(io.RawIOBase):
+    """
+    Adapts an iterator of byte chunks (e.g. httpx's iter_bytes) to the
+    file-like object tarfile's streaming mode reads from.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+def _strip_root(name: str) -> str:
+    # GitHub archives wrap everything in a single "<owner>-<repo>-<sha>/" directory
+    return name.split("/", 1)[1] if "/" in name else ""
+
+def iter_sources(fileobj, wanted: set = None):
+    """
+    Reads a gzipped tarball strictly front to back ("r|gz") and yields
+    (path, bytes) for each analyzable source as soon as its member arrives.
+    Other members are skipped without being buffered, so memory is bounded by
+    ARCHIVE_MAX_FILE_BYTES; reading stops once ARCHIVE_MAX_TOTAL_BYTES of
+    source has been yielded. `wanted` optionally restricts the paths.
+    """
+    total = 0
+    with tarfile.open(fileobj=fileobj, mode="r|gz") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            path = _strip_root(member.name)
+            if wanted is not None and path not in wanted:
+                continue
+            if not is_analyzable(path, member.size):
+                continue
+            if total + member.size > ARCHIVE_MAX_TOTAL_BYTES:
+                print(f"Archive source budget of {ARCHIVE_MAX_TOTAL_BYTES} bytes reached, skipping the rest")
+                return
+            total += member.size
+            yield path, tar.extractfile(member).read()
+
+def read_sources(archive: bytes, wanted: set) -> dict:
+    """
+    Extracts the files whose repo-relative paths are in `wanted` from a
+    gzipped tarball held in memory. Returns {path: bytes}.
+    """
+    return dict(iter_sources(io.BytesIO(archive), wanted))
@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import json
+import os
+
+from starlette.concurrency import run_in_threadpool
+
+from app import metrics
+from app.cache import TieredCache
+from app.complexity import run_in_worker
+from app.pdf_generator import render_pdf, render_cohort_pdf, render_report_zip
+from app.single_flight import SingleFlight
+
+# Every analysis response gets an "analysis_id" (a hash of its content) and is
+# kept here so reports can be rendered from it later.
+REPORT_RESULT_TTL = float(os.getenv("REPORT_RESULT_TTL", str(7 * 24 * 3600)))
+REPORT_RESULT_DISK_ITEMS = int(os.getenv("REPORT_RESULT_DISK_ITEMS", "20000"))
+# Rendered PDFs, keyed by the same hash. Bump PDF_LAYOUT_VERSION when the layout changes.
+REPORT_PDF_TTL = float(os.getenv("REPORT_PDF_TTL", str(7 * 24 * 3600)))
+REPORT_PDF_DISK_ITEMS = int(os.getenv("REPORT_PDF_DISK_ITEMS", "2000"))
+PDF_LAYOUT_VERSION = 1
+# Analyses one bulk export may contain.
+REPORT_EXPORT_MAX_ITEMS = int(os.getenv("REPORT_EXPORT_MAX_ITEMS", "200"))
+
+_results = TieredCache(
+    "analysis_reports",
+    ttl=REPORT_RESULT_TTL,
+    memory_items=256,
+    disk_items=REPORT_RESULT_DISK_ITEMS,
+)
+_pdfs = TieredCache(
+    "report_pdfs",
+    ttl=REPORT_PDF_TTL,
+    memory_items=32,
+    disk_items=REPORT_PDF_DISK_ITEMS,
+    codec="bytes",
+)
+# Simultaneous downloads of one report render it once
+_renders = SingleFlight()
+
+def result_id(result: dict) -> str:
+    body = {k: v for k, v in result.items() if k != "analysis_id"}
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()[:24]
+
+async def store_result(result: dict) -> dict:
+    """
+    Returns a copy of the analysis response carrying its "analysis_id", and
+    keeps it for report downloads.
+    """
+    analysis_id = result.get("analysis_id") or result_id(result)
+    result = {**result, "analysis_id": analysis_id}
+    # The ID is a content hash: a cache hit or a repeated fallback answer that
+    # is still in memory was stored already, so it costs no disk write
+    if _results.peek(analysis_id) is None:
+        await _results.put_async(analysis_id, result)
+    return result
+
+async def load_result(analysis_id: str):
+    return await _results.get_async(analysis_id)
+
+async def load_results(analysis_ids: list) -> list:
+    """
+    load_result for many IDs, in one bulk read; None for the unknown ones.
+    """
+    found = await asyncio.to_thread(_results.get_many, analysis_ids)
+    return [found.get(analysis_id) for analysis_id in analysis_ids]
+
+async def report_pdf(result: dict) -> bytes:
+    """
+    The PDF report for a stored result: from the cache when it has been
+    rendered before, otherwise rendered on a worker thread and cached.
+    """
+    key = f"v{PDF_LAYOUT_VERSION}:{result['analysis_id']}"
+    pdf = await _pdfs.get_async(key)
+    if pdf is not None:
+        return pdf
+
+    async def render():
+        with metrics.timed("pdf"):
+            pdf = await run_in_threadpool(
+                render_pdf, result["repo_name"], result["score"], result["summary"], result["roadmap"]
+            )
+        await _pdfs.put_async(key, pdf)
+        return pdf
+
+    return await _renders.run(key, render)
+
+async def export_reports(results: list, format: str = "pdf") -> bytes:
+    """
+    Renders stored results in bulk on a worker process: one multi-section PDF,
+    or with format="zip" a zip holding one PDF per analysis.
+    """
+    # Only what the layout needs crosses the process boundary
+    reports = [
+        {k: result.get(k) for k in ("repo_name", "owner", "score", "level", "summary", "roadmap")}
+        for result in results
+    ]
+    render = render_report_zip if format == "zip" else render_cohort_pdf
+    with metrics.timed("pdf_export"):
+        return await run_in_worker(render, reports)
@@ -0,0 +1,30 @@
+import os
+
+from app.cache import TieredCache
+from app.github_fetcher import parse_repo_url, fetch_head_sha
+
+# Results are keyed by commit SHA so they never go stale; the TTL only bounds
+# how long a grade survives scoring-rule changes.
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(24 * 3600)))
+RESULT_CACHE_MEMORY_ITEMS = int(os.getenv("RESULT_CACHE_MEMORY_ITEMS", "256"))
+RESULT_CACHE_DISK_ITEMS = int(os.getenv("RESULT_CACHE_DISK_ITEMS", "5000"))
+
+results = TieredCache(
+    "analysis_results",
+    ttl=RESULT_CACHE_TTL,
+    memory_items=RESULT_CACHE_MEMORY_ITEMS,
+    disk_items=RESULT_CACHE_DISK_ITEMS,
+)
+
+async def result_cache_key(repo_url: str):
+    """
+    Returns "owner/repo@<default branch sha>", or None when the head can't be
+    resolved (bad URL, rate limit, ...) - the caller then skips the cache.
+    """
+    try:
+        owner, repo_name = parse_repo_url(repo_url)
+        sha = await fetch_head_sha(owner, repo_name)
+    except Exception as e:
+        print(f"DEBUG: Result cache lookup skipped ({str(e)})")
+        return None
+    return f"{owner.lower()}/{repo_name.lower()}@{sha}"
@@ -0,0 +1,88 @@
+import asyncio
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first caller
+    starts the work, everyone arriving while it runs awaits the same task and
+    gets the same result (or exception). The key is forgotten as soon as the
+    task finishes, so later calls start fresh (and hit the result cache).
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    def in_flight(self, key):
+        task = self._tasks.get(key)
+        # Tasks can only be awaited from their own event loop
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            return task
+        return None
+
+    async def run(self, key, make_coro):
+        """
+        Awaits the in-flight task for `key`, or starts `make_coro()` as one.
+        A caller that is cancelled (client disconnected) stops waiting without
+        cancelling the work for the others.
+        """
+        return await asyncio.shield(self.start(key, make_coro))
+
+    def start(self, key, make_coro) -> asyncio.Task:
+        """
+        The in-flight task for `key`, or `make_coro()` started as one.
+        """
+        task = self.in_flight(key)
+        if task is None:
+            task = asyncio.ensure_future(make_coro())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            print(f"DEBUG: Joining in-flight call for {key}")
+        return task
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Marks any exception as retrieved, so an error nobody is left waiting
+            # for doesn't get logged as "never retrieved"
+            task.exception()
+
+class Feed:
+    """
+    Items published by one producer that any number of readers follow: each
+    reader gets everything published so far, then the rest as it comes, until
+    close() (with an error, every reader raises it).
+    """
+
+    def __init__(self):
+        self.items = []
+        self.closed = False
+        self.error = None
+        self._changed = asyncio.Event()
+
+    def publish(self, item):
+        self.items.append(item)
+        self._wake()
+
+    def close(self, error: BaseException = None):
+        self.closed = True
+        self.error = error
+        self._wake()
+
+    def _wake(self):
+        # Readers wait on the current event; each change sets it and starts a new one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self):
+        seen = 0
+        while True:
+            if seen < len(self.items):
+                seen += 1
+                yield self.items[seen - 1]
+            elif self.closed:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await self._changed.wait()
@@ -0,0 +1,88 @@
+import asyncio
+import importlib
+import os
+import threading
+import time
+
+from app import complexity, github_api, llm_client
+
+# Optional warm-up, in the background right after startup: the heavy imports that
+# are otherwise deferred to the first request that needs them (openai, the PDF
+# canvas, radon), the HTTP client pools and the complexity workers. Off by
+# default: on serverless cold starts it competes with the first request for CPU.
+# Set GITGRADE_WARMUP=1 on long-running servers; requests are accepted either way.
+GITGRADE_WARMUP = os.getenv("GITGRADE_WARMUP", "0") == "1"
+
+# Imported in this order; the slowest first, since it's the likeliest to be hit
+WARMUP_MODULES = ("openai", "reportlab.pdfgen.canvas", "radon.complexity")
+
+_started = False
+_lock = threading.Lock()
+# step -> seconds it took (or the error), for GET /api/warmup
+_steps = {}
+_done = threading.Event()
+
+def _timed(step, fn, *args):
+    started = time.perf_counter()
+    try:
+        fn(*args)
+        _steps[step] = round(time.perf_counter() - started, 4)
+    except Exception as e:
+        print(f"Warm-up step {step} failed: {e}")
+        _steps[step] = f"failed: {e}"
+
+def _start_complexity_workers():
+    # Spawned processes pay the interpreter + app import cost once, here,
+    # instead of inside the first large analysis
+    if complexity.COMPLEXITY_WORKERS <= 1:
+        return
+    pool = complexity.get_pool()
+    futures = [pool.submit(complexity._score_batch, []) for _ in range(complexity.COMPLEXITY_WORKERS)]
+    for future in futures:
+        future.result()
+
+def warm_loop(loop: asyncio.AbstractEventLoop):
+    """
+    The per-event-loop part: the async GitHub and LLM clients belong to one
+    loop, so these are made for the server's loop (but not on it).
+    """
+    _timed("github async client", github_api.get_async_client, loop)
+    if llm_client.is_configured():
+        _timed("llm client", llm_client._state, loop)
+
+def warm_process(loop: asyncio.AbstractEventLoop = None):
+    """
+    The whole warm-up, blocking: imports, the async clients for `loop` (when
+    given), the sync GitHub client and the complexity worker pool. Safe to
+    call more than once.
+    """
+    for module in WARMUP_MODULES:
+        _timed(f"import {module}", importlib.import_module, module)
+    if loop is not None:
+        warm_loop(loop)
+    _timed("github sync client", github_api.get_sync_client)
+    _timed("complexity workers", _start_complexity_workers)
+    _done.set()
+
+def start():
+    """
+    Starts the warm-up once per process (a no-op when disabled). Call from
+    the server's startup hook; it returns immediately, everything (openai's
+    import included) runs on the warm-up thread.
+    """
+    global _started
+    with _lock:
+        if _started or not GITGRADE_WARMUP:
+            return
+        _started = True
+    loop = asyncio.get_running_loop()
+    threading.Thread(target=warm_process, args=(loop,), name="gitgrade-warmup", daemon=True).start()
+
+def status() -> dict:
+    return {"enabled": GITGRADE_WARMUP, "started": _started, "done": _done.is_set(), "steps": dict(_steps)}
+
+async def wait(timeout: float = None) -> bool:
+    """
+    Waits for the background warm-up to finish; False on timeout.
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, _done.wait, timeout)
@@ -0,0 +1,34 @@
+"""
+Per-request cost of the deterministic fallback scorer (what /analyze answers
+with during a GitHub outage), per URL and variant.
+
+    cd backend && python benchmarks/bench_fallback.py [n_urls]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.fallback_scorer import fallback_result, FETCH_FAILED, ANALYSIS_FAILED
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    urls = [f"https://github.com/user{i}/project-{i}" for i in range(n)]
+
+    print(f"{n} URLs, best of 5")
+    for variant in (FETCH_FAILED, ANALYSIS_FAILED):
+        elapsed = timed(lambda: [fallback_result(url, variant) for url in urls])
+        print(f"  {variant:<9} {elapsed / n * 1e6:6.2f} us/url")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Cold-start cost of the API process: runs `python -X importtime -c "import app.main"`
+in a fresh interpreter, prints the total and the slowest top-level imports, and
+fails (exit 1) when the total exceeds --max-ms or when a dependency that is
+meant to load lazily (see LAZY_MODULES) is imported at startup again.
+
+    cd backend && python benchmarks/bench_importtime.py [--max-ms 1500] [--runs 3] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only imported on first use (or by the background warm-up), never by `import app.main`
+LAZY_MODULES = ("openai", "reportlab.pdfgen", "radon", "uvicorn")
+
+def import_profile(module: str = "app.main"):
+    """
+    One cold import in a new interpreter. Returns [(cumulative_us, depth, name)]
+    for every module imported, in import order.
+    """
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in completed.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative), depth, name.strip()))
+    return rows
+
+def eager_lazy_modules(rows) -> list:
+    names = {name for _, _, name in rows}
+    return [m for m in LAZY_MODULES if m in names]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-ms", type=float, default=1500, help="budget for the fastest run")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [import_profile() for _ in range(args.runs)]
+    # A module's time sits with the top-level import that pulled it in
+    totals = [sum(us for us, depth, _ in rows if depth == 0) / 1000 for rows in runs]
+    best = runs[totals.index(min(totals))]
+
+    print(f"import app.main: best {min(totals):.0f} ms, worst {max(totals):.0f} ms ({args.runs} runs)")
+    print("slowest third-party imports:")
+    third_party = [row for row in best if row[1] <= 2 and not row[2].startswith("app")]
+    for us, _, name in sorted(third_party, reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = eager_lazy_modules(best)
+    if eager:
+        print(f"FAIL: imported at startup, should be lazy: {', '.join(eager)}")
+        failed = True
+    if min(totals) > args.max_ms:
+        print(f"FAIL: {min(totals):.0f} ms is over the {args.max_ms:.0f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+End-to-end throughput and latency of POST /api/analyze against replayed GitHub
+responses (github_fixture.py): a fixed number of requests at fixed concurrency
+per repo profile, each for a different repository, so every one runs the full
+pipeline. Reports throughput, p50/p95/p99 latency and GitHub calls per analysis.
+
+    cd backend && python benchmarks/bench_pipeline.py [--profiles small,medium,huge] [--concurrency 4]
+        [--requests N] [--latency 30] [--jitter 0] [--token] [--fixture fixtures/repo.json] [--json out.json]
+
+By default the app runs in this process (no uvicorn, fresh caches, no LLM key
+so summaries are the deterministic ones) and the fixture server is started
+here too. To measure a real server instead, start the fixtures with
+`github_fixture.py serve`, the server with GITHUB_API_URL pointing at it, and pass
+--server http://127.0.0.1:8000 --fixture-url http://127.0.0.1:9000.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from github_fixture import FixtureServer, load_fixtures
+
+# Requests per profile when --requests isn't given
+DEFAULT_REQUESTS = {"small": 40, "medium": 12, "huge": 3}
+
+def percentile(values: list, p: float) -> float:
+    # Nearest-rank
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+async def run_profile(client, fixture_stats, name: str, count: int, concurrency: int) -> dict:
+    from app.fallback_scorer import SUMMARY_PREFIX
+
+    async def analyze(index):
+        started = time.perf_counter()
+        response = await client.post("/api/analyze", json={"url": f"https://github.com/bench/{name}-{index}"})
+        elapsed = time.perf_counter() - started
+        fallback = response.status_code == 200 and response.json()["summary"].startswith(tuple(SUMMARY_PREFIX.values()))
+        return elapsed, response.status_code, fallback
+
+    # One untimed analysis first: lazy imports, worker processes and connection pools
+    await analyze("warmup")
+    await fixture_stats(reset=True)
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def bounded(index):
+        async with slots:
+            return await analyze(index)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(bounded(i) for i in range(count)))
+    wall = time.perf_counter() - started
+    calls = await fixture_stats()
+
+    latencies = [elapsed for elapsed, _, _ in results]
+    return {
+        "profile": name,
+        "requests": count,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(count / wall, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "github_calls_per_analysis": round(calls["total"] / count, 2),
+        "github_calls": calls["calls"],
+        "errors": sum(1 for _, status, _ in results if status != 200),
+        "fallbacks": sum(1 for _, _, fallback in results if fallback),
+    }
+
+def print_table(rows: list):
+    print(f"{'profile':<10}{'reqs':>6}{'conc':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'calls/an':>10}{'errors':>8}{'fallbk':>8}")
+    for r in rows:
+        print(f"{r['profile']:<10}{r['requests']:>6}{r['concurrency']:>6}{r['throughput_rps']:>9.2f}{r['p50_ms']:>10.1f}"
+              f"{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['github_calls_per_analysis']:>10.2f}{r['errors']:>8}{r['fallbacks']:>8}")
+    for r in rows:
+        print(f"  {r['profile']}: " + ", ".join(f"{k} x{v}" for k, v in sorted(r["github_calls"].items())))
+
+async def run(args, names: list, progress) -> list:
+    if args.server:
+        client = httpx.AsyncClient(base_url=args.server, timeout=600)
+        fixture_client = httpx.AsyncClient(base_url=args.fixture_url)
+
+        async def fixture_stats(reset=False):
+            if reset:
+                await fixture_client.post("/_fixture/reset")
+                return None
+            return (await fixture_client.get("/_fixture/stats")).json()
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=600)
+
+        async def fixture_stats(reset=False):
+            if reset:
+                args.fixture_server.reset()
+                return None
+            return args.fixture_server.stats()
+
+    async with client:
+        rows = []
+        for name in names:
+            count = args.requests or DEFAULT_REQUESTS.get(name, 10)
+            print(f"{name}: {count} analyses at concurrency {args.concurrency}...", file=progress, flush=True)
+            rows.append(await run_profile(client, fixture_stats, name, count, args.concurrency))
+        return rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", default="small,medium,huge")
+    parser.add_argument("--fixture", action="append", default=[], help="recorded fixture file (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=0, help="analyses per profile (default: per-profile)")
+    parser.add_argument("--latency", type=float, default=30, help="ms added to every GitHub response")
+    parser.add_argument("--jitter", type=float, default=0, help="extra random ms per GitHub response")
+    parser.add_argument("--token", action="store_true", help="run as an authenticated client (GraphQL commit stats)")
+    parser.add_argument("--server", help="benchmark a running server instead of an in-process app")
+    parser.add_argument("--fixture-url", default="http://127.0.0.1:9000", help="fixture server of --server runs")
+    parser.add_argument("--json", help="also write the results here")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's debug output")
+    args = parser.parse_args()
+
+    profiles = [p for p in args.profiles.split(",") if p]
+    # --server runs use the fixtures of the separately started fixture server
+    fixtures = load_fixtures([] if args.server else profiles, args.fixture)
+    names = profiles + [name for name in fixtures if name not in profiles]
+    cache_dir = None
+    if not args.server:
+        args.fixture_server = FixtureServer(fixtures, args.latency / 1000, args.jitter / 1000).start()
+        cache_dir = tempfile.mkdtemp(prefix="gitgrade-bench-")
+        # Read at import time by the app modules, so set before importing app.main
+        os.environ.update({
+            "GITHUB_API_URL": args.fixture_server.url,
+            "GITGRADE_CACHE_DIR": cache_dir,
+            "GITGRADE_WARMUP": "0",
+        })
+        for name in ("GITHUB_TOKEN", "GITHUB_TOKENS", "OPENAI_API_KEY"):
+            os.environ.pop(name, None)
+        if args.token:
+            os.environ["GITHUB_TOKEN"] = "bench-token"
+
+    progress = sys.stderr
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.ExitStack() as quiet:
+            if not args.verbose:
+                quiet.enter_context(contextlib.redirect_stdout(devnull))
+                quiet.enter_context(contextlib.redirect_stderr(devnull))
+            rows = asyncio.run(run(args, names, progress))
+    finally:
+        if cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"latency_ms": args.latency, "token": args.token, "results": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+A local stand-in for the GitHub API that replays fixture responses, so the
+pipeline can be benchmarked without the network or a rate limit
+(see bench_pipeline.py, which starts one itself).
+
+A fixture is one repository's responses to the calls an analysis makes,
+keyed by the path below /repos/{owner}/{repo} (plus "graphql"), in JSON:
+
+    {"name": "...", "responses": {"/languages": {"status": 200, "headers": {...}, "body": "<base64>"}, ...}}
+
+Fixtures are either recorded from api.github.com or synthesized (the "small",
+"medium" and "huge" profiles). Any repository named "<fixture>-<n>" is served
+from fixture <fixture>, with its head SHA and blob SHAs derived from the full
+name, so every repo of a run is a cache miss - like a stream of new submissions.
+
+    cd backend && python benchmarks/github_fixture.py record owner/repo fixtures/repo.json
+    cd backend && python benchmarks/github_fixture.py serve --port 9000 [--profiles small,medium] [--fixture fixtures/repo.json] [--latency 50]
+
+GET /_fixture/stats returns the calls served so far, POST /_fixture/reset clears them.
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import tarfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlencode, urlparse, parse_qsl
+
+# Must match app.github_fetcher.RECENT_COMMITS (the per_page of the commit calls)
+RECENT_COMMITS = 20
+
+# files: Python sources, commits: history length, size: the "size" GitHub reports
+# (KB; above ARCHIVE_STREAM_THRESHOLD_KB the archive is streamed), readme: characters
+PROFILES = {
+    "small": {"files": 12, "other_files": 6, "commits": 45, "size": 300, "readme": 900},
+    "medium": {"files": 250, "other_files": 80, "commits": 1800, "size": 9000, "readme": 2500},
+    "huge": {"files": 4000, "other_files": 1500, "commits": 60000, "size": 40000, "readme": 6000},
+}
+
+COMMIT_MESSAGES = (
+    "feat: add pagination to the search endpoint",
+    "fix: handle empty payloads in the parser",
+    "refactor: split the settings module",
+    "docs: explain the deployment steps",
+    "wip",
+    "update",
+    "test: cover the retry logic",
+    "chore: bump dependencies",
+)
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+def _json_response(body, headers: dict = None) -> dict:
+    return {"status": 200, "headers": {"content-type": "application/json", **(headers or {})},
+            "body": _b64(json.dumps(body).encode())}
+
+def _raw_response(body: bytes, content_type: str = "application/vnd.github.raw") -> dict:
+    return {"status": 200, "headers": {"content-type": content_type}, "body": _b64(body)}
+
+def _python_source(rng: random.Random, index: int) -> bytes:
+    # Plausible modules with a spread of cyclomatic complexity
+    lines = [f'"""Module {index}."""', "import os", ""]
+    for f in range(rng.randint(2, 8)):
+        args = ", ".join(f"a{i}" for i in range(rng.randint(1, 4)))
+        lines.append(f"def func_{index}_{f}({args}):")
+        lines.append("    total = 0")
+        for b in range(rng.randint(0, 6)):
+            kind = rng.choice(("if", "for", "while"))
+            if kind == "if":
+                lines.append(f"    if a0 > {b}:")
+                lines.append(f"        total += {b}")
+            elif kind == "for":
+                lines.append(f"    for i in range({b + 1}):")
+                lines.append("        total += i")
+            else:
+                lines.append(f"    while total < {b}:")
+                lines.append("        total += 1")
+        lines.append("    return total")
+        lines.append("")
+    return "\n".join(lines).encode()
+
+def synthesize(profile: str, seed: int = 0) -> dict:
+    """
+    A fixture for a made-up repository of the given PROFILES size.
+    """
+    spec = PROFILES[profile]
+    rng = random.Random(f"{profile}:{seed}")
+    name = profile
+
+    sources = {}
+    for i in range(spec["files"]):
+        package = "tests" if i % 7 == 0 else f"src/pkg{i % 25}"
+        prefix = "test_" if package == "tests" else "mod_"
+        sources[f"{package}/{prefix}{i}.py"] = _python_source(rng, i)
+    others = {f"assets/file_{i}.{rng.choice(('js', 'css', 'md', 'json'))}": b"x" * rng.randint(50, 400)
+              for i in range(spec["other_files"])}
+
+    tree, dirs = [], set()
+    for path, content in {**sources, **others}.items():
+        parts = path.split("/")
+        for depth in range(1, len(parts)):
+            dirs.add("/".join(parts[:depth]))
+        tree.append({"path": path, "mode": "100644", "type": "blob", "size": len(content),
+                     "sha": hashlib.sha1(content).hexdigest()})
+    tree += [{"path": d, "mode": "040000", "type": "tree", "sha": hashlib.sha1(d.encode()).hexdigest()}
+             for d in sorted(dirs)]
+
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+        for path, content in {**sources, **others}.items():
+            member = tarfile.TarInfo(f"bench-{name}-0000000/{path}")
+            member.size = len(content)
+            tar.addfile(member, io.BytesIO(content))
+
+    commits = spec["commits"]
+    last_page = -(-commits // RECENT_COMMITS)
+    page = lambda n: [{"sha": hashlib.sha1(f"{name}{n}{i}".encode()).hexdigest(),
+                       "commit": {"message": rng.choice(COMMIT_MESSAGES)}} for i in range(n)]
+    first = page(min(commits, RECENT_COMMITS))
+    link = {}
+    if last_page > 1:
+        link["link"] = (f'<https://api.github.com/repositories/1/commits?per_page={RECENT_COMMITS}&page=2>; rel="next", '
+                        f'<https://api.github.com/repositories/1/commits?per_page={RECENT_COMMITS}&page={last_page}>; rel="last"')
+
+    responses = {
+        "": _json_response({"name": name, "full_name": f"bench/{name}", "stargazers_count": rng.randint(0, 500),
+                            "forks_count": rng.randint(0, 50), "default_branch": "main", "size": spec["size"]}),
+        "/commits/HEAD": _raw_response(hashlib.sha1(name.encode()).hexdigest().encode(), "application/vnd.github.sha"),
+        "/languages": _json_response({"Python": sum(map(len, sources.values())), "JavaScript": 1200}),
+        "/readme": _raw_response(("# " + name + "\n\n" + "Lorem ipsum dolor sit amet. " * (spec["readme"] // 28)).encode()),
+        "/git/trees/main?recursive=1": _json_response({"sha": "0" * 40, "tree": tree, "truncated": False}),
+        "/tarball/main": _raw_response(archive.getvalue(), "application/x-gzip"),
+        f"/commits?per_page={RECENT_COMMITS}": _json_response(first, link),
+        "graphql": _json_response({"data": {"repository": {"defaultBranchRef": {"target": {"history": {
+            "totalCount": commits, "nodes": [{"message": c["commit"]["message"]} for c in first]}}}}}}),
+    }
+    if last_page > 1:
+        tail = commits - (last_page - 1) * RECENT_COMMITS
+        responses[f"/commits?page={last_page}&per_page={RECENT_COMMITS}"] = _json_response(page(tail))
+    return {"name": name, "responses": responses}
+
+def _normalize(suffix: str, query: str) -> str:
+    # Query parameters in a fixed order, so recorded and requested keys agree
+    params = sorted(parse_qsl(query))
+    return suffix + ("?" + urlencode(params) if params else "")
+
+class FixtureServer:
+    """
+    Serves fixtures over HTTP on 127.0.0.1. Each response is delayed by
+    `latency` seconds (plus up to `jitter`), like a round trip to GitHub.
+    """
+
+    def __init__(self, fixtures: dict, latency: float = 0.0, jitter: float = 0.0, port: int = 0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"total": sum(self.calls.values()), "calls": dict(self.calls)}
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def respond(self, method: str, path: str, body: bytes, headers) -> tuple:
+        """
+        Returns (status, headers, body) for one request.
+        """
+        url = urlparse(path)
+        if method == "POST" and url.path == "/graphql":
+            variables = json.loads(body).get("variables", {})
+            owner, repo, suffix = variables.get("owner"), variables.get("name"), "graphql"
+        else:
+            match = re.match(r"^/repos/([^/]+)/([^/]+)(/.*)?$", url.path)
+            if not match:
+                return 404, {}, b'{"message": "Not Found"}'
+            owner, repo, suffix = match.group(1), match.group(2), match.group(3) or ""
+        key = _normalize(suffix, url.query)
+        # Endpoint names without the variable parts, for the per-endpoint counts
+        self._count(method + " " + (re.sub(r"\bpage=\d+", "page=N", key) or "/"))
+
+        fixture = self.fixtures.get(repo.rsplit("-", 1)[0]) or self.fixtures.get(repo)
+        entry = fixture["responses"].get(key) if fixture else None
+        if entry is None:
+            return 404, {"content-type": "application/json"}, b'{"message": "Not Found"}'
+
+        content = base64.b64decode(entry["body"])
+        full_name = f"{owner}/{repo}"
+        if suffix == "":
+            info = json.loads(content)
+            content = json.dumps({**info, "name": repo, "full_name": full_name}).encode()
+        elif suffix == "/commits/HEAD":
+            content = hashlib.sha1(full_name.encode() + content).hexdigest().encode()
+        elif suffix.startswith("/git/trees/"):
+            # Fresh blob SHAs per repo: the complexity cache can't short-circuit the run
+            tree = json.loads(content)
+            for item in tree["tree"]:
+                item["sha"] = hashlib.sha1((full_name + item["sha"]).encode()).hexdigest()
+            content = json.dumps(tree).encode()
+
+        response_headers = {k: v for k, v in entry["headers"].items() if k.lower() in ("content-type", "link")}
+        response_headers["etag"] = '"%s"' % hashlib.md5(content).hexdigest()
+        response_headers["x-ratelimit-limit"] = "1000000"
+        response_headers["x-ratelimit-remaining"] = "999999"
+        response_headers["x-ratelimit-reset"] = str(int(time.time()) + 3600)
+        response_headers["x-ratelimit-resource"] = "graphql" if suffix == "graphql" else "core"
+        if entry["status"] == 200 and headers.get("If-None-Match") == response_headers["etag"]:
+            return 304, response_headers, b""
+        return entry["status"], response_headers, content
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like the real API
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, headers, body):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _serve(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if self.path == "/_fixture/stats":
+                    return self._reply(200, {"content-type": "application/json"}, json.dumps(server.stats()).encode())
+                if self.path == "/_fixture/reset":
+                    server.reset()
+                    return self._reply(204, {}, b"")
+                if server.latency or server.jitter:
+                    time.sleep(server.latency + random.random() * server.jitter)
+                self._reply(*server.respond(method, self.path, body, self.headers))
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+        return Handler
+
+def record(full_name: str, api_url: str = "https://api.github.com") -> dict:
+    """
+    Records the responses an analysis of `full_name` needs from the live API
+    (set GITHUB_TOKEN to include the GraphQL commit query).
+    """
+    import httpx
+
+    token = os.getenv("GITHUB_TOKEN")
+    headers = {"Accept": "application/vnd.github+json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    base = f"/repos/{full_name}"
+    owner, name = full_name.split("/")
+    responses = {}
+
+    with httpx.Client(base_url=api_url, headers=headers, follow_redirects=True, timeout=120) as client:
+        def get(suffix, params=None, accept=None):
+            response = client.get(base + suffix, params=params, headers={"Accept": accept} if accept else None)
+            responses[_normalize(suffix, urlencode(sorted((params or {}).items())))] = {
+                "status": response.status_code,
+                "headers": {k: v for k, v in response.headers.items() if k in ("content-type", "link")},
+                "body": _b64(response.content),
+            }
+            return response
+
+        info = get("").json()
+        ref = info["default_branch"]
+        get("/commits/HEAD", accept="application/vnd.github.sha")
+        get("/languages")
+        get("/readme", accept="application/vnd.github.raw")
+        get(f"/git/trees/{ref}", params={"recursive": 1})
+        get(f"/tarball/{ref}")
+        first = get("/commits", params={"per_page": RECENT_COMMITS})
+        last = first.links.get("last")
+        if last:
+            page = int(dict(parse_qsl(urlparse(last["url"]).query))["page"])
+            get("/commits", params={"page": page, "per_page": RECENT_COMMITS})
+        if token:
+            from app.github_fetcher import COMMIT_STATS_QUERY
+            response = client.post("/graphql", json={
+                "query": COMMIT_STATS_QUERY, "variables": {"owner": owner, "name": name, "n": RECENT_COMMITS},
+            })
+            responses["graphql"] = {"status": response.status_code, "headers": {"content-type": "application/json"},
+                                    "body": _b64(response.content)}
+    return {"name": name, "responses": responses}
+
+def load_fixtures(profiles: list = (), paths: list = ()) -> dict:
+    """
+    {fixture name: fixture} for the synthetic profiles plus recorded files.
+    """
+    fixtures = {profile: synthesize(profile) for profile in profiles}
+    for path in paths:
+        with open(path) as f:
+            fixture = json.load(f)
+        fixtures[fixture["name"]] = fixture
+    return fixtures
+
+def main():
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+    rec = commands.add_parser("record", help="record a fixture from the GitHub API")
+    rec.add_argument("repo", help="owner/name")
+    rec.add_argument("out")
+    rec.add_argument("--api-url", default="https://api.github.com")
+    serve = commands.add_parser("serve", help="serve fixtures until interrupted")
+    serve.add_argument("--port", type=int, default=9000)
+    serve.add_argument("--profiles", default="small,medium,huge")
+    serve.add_argument("--fixture", action="append", default=[])
+    serve.add_argument("--latency", type=float, default=0, help="ms per response")
+    serve.add_argument("--jitter", type=float, default=0, help="extra random ms per response")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        fixture = record(args.repo, args.api_url)
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(fixture, f)
+        print(f"Recorded {len(fixture['responses'])} responses of {args.repo} to {args.out}")
+        return
+
+    fixtures = load_fixtures([p for p in args.profiles.split(",") if p], args.fixture)
+    server = FixtureServer(fixtures, args.latency / 1000, args.jitter / 1000, args.port).start()
+    print(f"Serving {', '.join(fixtures)} on {server.url} (repos named <fixture>-<n>); Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# Loaded by pytest before any test module, so the on-disk caches (read from
+# GITGRADE_CACHE_DIR when app.cache is first imported) always go to a scratch
+# directory, whichever test file imports the app first.
+CACHE_DIR = tempfile.mkdtemp(prefix="gitgrade-test-")
+os.environ["GITGRADE_CACHE_DIR"] = CACHE_DIR
+atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+# Nothing listens there: a test that reaches GitHub by mistake fails fast
+# instead of calling api.github.com (tests that need the API stub it)
+os.environ["GITHUB_API_URL"] = "http://127.0.0.1:9"
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
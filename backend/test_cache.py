@@ -0,0 +1,79 @@
+import asyncio
+import sqlite3
+import threading
+
+from app.cache import TieredCache
+
+def test_disk_reads_do_not_write_but_still_count_for_lru(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = TieredCache("lru_test", ttl=60, memory_items=0, disk_items=10, path=path)
+    for i in range(10):
+        writer.put(f"k{i}", i)
+
+    reader = TieredCache("lru_test", ttl=60, memory_items=0, disk_items=10, path=path)
+    assert reader.get("k0") == 0
+    assert reader._conn().total_changes == 0
+
+    # Over the cap: the read of k0 is written with this put, so the two least
+    # recently used after it (k1, k2) are evicted, down to 90% of the cap
+    reader.put("new", 10)
+    assert reader.get("k0") == 0
+    assert reader.get("k1") is None and reader.get("k2") is None
+    assert reader.get("k3") == 3
+    assert reader.get("new") == 10
+
+def test_async_access_keeps_sqlite_off_the_event_loop(tmp_path, monkeypatch):
+    cache = TieredCache("async_test", ttl=60, memory_items=0, path=str(tmp_path / "cache.sqlite3"))
+    threads = []
+    connect = cache._conn
+
+    def conn():
+        threads.append(threading.get_ident())
+        return connect()
+
+    monkeypatch.setattr(cache, "_conn", conn)
+
+    async def run():
+        await cache.put_async("a", {"x": 1})
+        return await cache.get_async("a"), await cache.get_async("missing"), threading.get_ident()
+
+    found, missing, loop_thread = asyncio.run(run())
+    assert found == {"x": 1}
+    assert missing is None
+    assert threads and loop_thread not in threads
+
+def test_unusable_disk_tier_falls_back_to_memory(tmp_path, capsys):
+    # The cache directory can't be created: a file is in the way
+    (tmp_path / "not-a-dir").write_text("")
+    cache = TieredCache("broken_test", ttl=60, path=str(tmp_path / "not-a-dir" / "cache.sqlite3"))
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("missing") is None
+    assert cache.get_many(["a", "b"]) == {"a": 1}
+    cache.clear()
+
+    async def run():
+        await cache.put_async("b", 2)
+        return await cache.get_async("b"), await cache.get_async("missing")
+
+    assert asyncio.run(run()) == (2, None)
+    # Logged once, not per operation
+    assert capsys.readouterr().err.count("disk tier unavailable") == 1
+
+def test_a_locked_database_drops_the_write(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TieredCache("locked_test", ttl=60, memory_items=0, path=path)
+    cache.put("a", 1)
+    # Another process holding the write lock past the timeout
+    other = sqlite3.connect(path, timeout=0)
+    other.execute("BEGIN EXCLUSIVE")
+    cache._conn().execute("PRAGMA busy_timeout = 0")
+    try:
+        # WAL readers aren't blocked; the write is dropped instead of raising
+        assert cache.get("a") == 1
+        cache.put("b", 2)
+    finally:
+        other.rollback()
+    assert cache.get("b") is None
+    cache.put("b", 2)
+    assert cache.get("b") == 2
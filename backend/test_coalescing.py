@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import httpx
+
+from app import main
+
+def fake_pipeline(monkeypatch):
+    runs = []
+
+    async def stages(url, fallback=True):
+        runs.append(url)
+        yield "repo", {"repo_name": "repo"}
+        await asyncio.sleep(0.05)
+        yield "code", {"complexity": 3}
+        await asyncio.sleep(0.05)
+        yield "result", {"repo_name": "repo", "score": 70}
+
+    monkeypatch.setattr(main, "analysis_stages", stages)
+    return runs
+
+def test_stream_and_analyze_requests_share_one_run(monkeypatch):
+    runs = fake_pipeline(monkeypatch)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = {"url": "https://github.com/Demo/Repo"}
+            first = asyncio.create_task(client.post("/api/analyze/stream", json=body))
+            await asyncio.sleep(0.02)
+            # Join mid-run: one after the first stage, one plain /analyze
+            late, plain = await asyncio.gather(
+                client.post("/api/analyze/stream", json={"url": "github.com/demo/repo"}),
+                client.post("/api/analyze", json=body),
+            )
+            return await first, late, plain
+
+    first, late, plain = asyncio.run(run())
+    assert len(runs) == 1
+    for response in (first, late):
+        stages = [json.loads(line)["stage"] for line in response.text.splitlines()]
+        assert stages == ["repo", "code", "result"]
+    assert plain.json() == {"repo_name": "repo", "score": 70}
+    assert main.stage_feeds == {}
+
+def test_a_failed_run_reaches_every_stream(monkeypatch):
+    async def stages(url, fallback=True):
+        yield "repo", {"repo_name": "repo"}
+        await asyncio.sleep(0.05)
+        raise RuntimeError("pipeline broke")
+
+    monkeypatch.setattr(main, "analysis_stages", stages)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = {"url": "https://github.com/demo/broken"}
+            return await asyncio.gather(*[client.post("/api/analyze/stream", json=body) for _ in range(2)])
+
+    for response in asyncio.run(run()):
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["stage"] for line in lines] == ["repo", "error"]
+        assert lines[-1]["data"] == {"error": "pipeline broke"}
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append(os.path.join(BACKEND_DIR, "benchmarks"))
+from bench_importtime import LAZY_MODULES
+
+def _loaded_after(code: str) -> list:
+    check = f"import sys\n{code}\nprint(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    completed = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return completed.stdout.split()
+
+def test_heavy_dependencies_are_not_imported_at_startup():
+    assert _loaded_after("import app.main") == []
+
+def test_lazy_dependencies_load_on_first_use():
+    loaded = _loaded_after(
+        "from app.pdf_generator import render_pdf\n"
+        "from app.complexity import file_metrics\n"
+        "assert render_pdf('demo', 50, 'ok', ['a']).startswith(b'%PDF')\n"
+        "file_metrics('def f():\\n    return 1\\n')"
+    )
+    assert loaded == ["reportlab.pdfgen", "radon"]
+
+def test_warmup_leaves_the_event_loop_free():
+    # start() used to import openai on the loop; now it only starts the thread
+    code = (
+        "import asyncio, time\n"
+        "from app import warmup, github_api, llm_client\n"
+        "async def main():\n"
+        "    started = time.perf_counter()\n"
+        "    warmup.start()\n"
+        "    assert time.perf_counter() - started < 0.05\n"
+        "    assert await warmup.wait(60)\n"
+        "    loop = asyncio.get_running_loop()\n"
+        "    # Created by the warm-up thread, for this loop\n"
+        "    assert loop in github_api._clients and loop in llm_client._states\n"
+        "    print('\\n'.join(sorted(s for s in warmup.status()['steps'] if 'client' in s)))\n"
+        "asyncio.run(main())"
+    )
+    env = {**os.environ, "GITGRADE_WARMUP": "1", "COMPLEXITY_WORKERS": "1", "OPENAI_API_KEY": "test-key"}
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    assert completed.stdout.splitlines() == ["github async client", "github sync client", "llm client"]
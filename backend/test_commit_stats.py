@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import github_fetcher
+from app.github_api import GitHubAPIError
+from app.github_fetcher import RepoContext, RECENT_COMMITS, fetch_commit_stats
+
+CTX = RepoContext("demo", "repo", {"name": "repo", "default_branch": "main"})
+
+def commits(n, start=0):
+    return [{"commit": {"message": f"Commit number {i}"}} for i in range(start, start + n)]
+
+@pytest.fixture
+def github(monkeypatch):
+    """
+    A REST commit list of `total` commits, RECENT_COMMITS per page; records
+    the calls made.
+    """
+    api = {"total": 0, "token": False, "graphql": None, "calls": []}
+
+    def page(number):
+        start = (number - 1) * RECENT_COMMITS
+        return commits(max(0, min(RECENT_COMMITS, api["total"] - start)), start)
+
+    async def request(path, params=None, accept=None):
+        api["calls"].append(("rest", params))
+        last = -(-api["total"] // RECENT_COMMITS)
+        headers = {}
+        if last > 1:
+            url = f"https://api.github.com/repositories/1/commits?per_page={RECENT_COMMITS}"
+            headers["link"] = f'<{url}&page=2>; rel="next", <{url}&page={last}>; rel="last"'
+        return httpx.Response(200, headers=headers, json=page(1), request=httpx.Request("GET", "https://api.github.com" + path))
+
+    async def get_json(path, params=None):
+        api["calls"].append(("rest", params))
+        return page(params["page"])
+
+    async def graphql(query, variables=None):
+        api["calls"].append(("graphql", variables))
+        if isinstance(api["graphql"], Exception):
+            raise api["graphql"]
+        return api["graphql"]
+
+    monkeypatch.setattr(github_fetcher.github_api, "request", request)
+    monkeypatch.setattr(github_fetcher.github_api, "get_json", get_json)
+    monkeypatch.setattr(github_fetcher.github_api, "graphql", graphql)
+    monkeypatch.setattr(github_fetcher.github_api, "has_token", lambda: api["token"])
+    return api
+
+def stats():
+    return asyncio.run(fetch_commit_stats(CTX))
+
+def test_single_page(github):
+    github["total"] = 7
+    result = stats()
+    assert result["total_count"] == 7
+    assert result["messages"] == [f"Commit number {i}" for i in range(7)]
+    # No Link header: nothing after the first page
+    assert len(github["calls"]) == 1
+
+@pytest.mark.parametrize("total", [RECENT_COMMITS * 5 + 3, RECENT_COMMITS * 5, RECENT_COMMITS + 1])
+def test_count_from_the_partial_last_page(github, total):
+    github["total"] = total
+    result = stats()
+    assert result["total_count"] == total
+    assert len(result["messages"]) == RECENT_COMMITS
+    # The first page and the last one, never the pages in between
+    last = -(-total // RECENT_COMMITS)
+    assert github["calls"] == [
+        ("rest", {"per_page": RECENT_COMMITS}),
+        ("rest", {"per_page": RECENT_COMMITS, "page": last}),
+    ]
+
+def test_graphql_with_a_token(github):
+    github["token"] = True
+    github["graphql"] = {"repository": {"defaultBranchRef": {"target": {"history": {
+        "totalCount": 1234, "nodes": [{"message": "Latest"}]}}}}}
+    assert stats() == {"total_count": 1234, "messages": ["Latest"]}
+    assert [kind for kind, _ in github["calls"]] == ["graphql"]
+
+@pytest.mark.parametrize("error", [
+    GitHubAPIError(200, "Something went wrong while executing your query"),
+    # An empty repository has no default branch ref
+    None,
+])
+def test_graphql_failures_fall_back_to_rest(github, error):
+    github["token"] = True
+    github["total"] = RECENT_COMMITS * 2 + 5
+    github["graphql"] = error or {"repository": {"defaultBranchRef": None}}
+    result = stats()
+    assert result["total_count"] == RECENT_COMMITS * 2 + 5
+    assert [kind for kind, _ in github["calls"]] == ["graphql", "rest", "rest"]
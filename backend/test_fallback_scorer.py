@@ -0,0 +1,37 @@
+from app.fallback_scorer import fallback_result, FETCH_FAILED, ANALYSIS_FAILED
+
+URLS = [
+    "https://github.com/demo/repo-one",
+    "https://github.com/different/api-two",
+    "https://github.com/someone/pro-tools.git",
+    "https://github.com/x/ai",
+    "not-a-url",
+] + [f"https://github.com/user{i}/project-{i * 7}" for i in range(200)]
+
+def test_same_grades_as_the_inline_engines():
+    # Pinned from the mock engines that used to live in main.py
+    fetch = fallback_result("https://github.com/demo/repo-one", FETCH_FAILED)
+    assert fetch["score"] == 53
+    assert fetch["level"] == "Intermediate"
+    assert fetch["verdict"] == "Weak"
+    assert fetch["breakdown"]["Code Quality & Engineering Maturity"] == 17
+    assert fetch["summary"].startswith("AI Recruiter Evaluation (Fetch Fallback): Solid functionality")
+    assert fetch["roadmap"][0] == "Improve README with 'Product Thinking' sections"
+    assert len(fetch["roadmap"]) == 4
+    assert fetch["details"] == {"code": {"complexity": 5, "has_tests": False}, "commits": {"good_commit_ratio": 0.14}}
+
+    analysis = fallback_result("https://github.com/demo/repo-one", ANALYSIS_FAILED)
+    assert analysis["score"] == 88
+    assert analysis["verdict"] == "Strong Hire"
+    assert analysis["summary"].startswith("AI Recruiter Evaluation: Excellent codebase")
+
+    # "api" in the name nudges the analysis-failure variant only
+    assert fallback_result("https://github.com/different/api-two", FETCH_FAILED)["score"] == 65
+    assert fallback_result("https://github.com/different/api-two", ANALYSIS_FAILED)["score"] == 67
+
+def test_results_are_plain_json_types():
+    for variant in (FETCH_FAILED, ANALYSIS_FAILED):
+        for url in URLS:
+            result = fallback_result(url, variant)
+            assert type(result["score"]) is int and 0 < result["score"] <= 100
+            assert all(type(v) is int for v in result["breakdown"].values())
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from app import git_clone
+from app.code_analyzer import analyze_code
+from app.github_fetcher import RepoContext
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+SOURCE = b"def f(x):\n    if x:\n        return 1\n    return 2\n"
+
+def git(cwd, *args):
+    subprocess.run(["git", "-C", cwd, *args], check=True, capture_output=True)
+
+def commit(work, files: dict, message: str):
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(os.path.join(work, path)) or work, exist_ok=True)
+        with open(os.path.join(work, path), "wb") as f:
+            f.write(content)
+    git(work, "add", "-A")
+    git(work, "commit", "-q", "-m", message)
+    git(work, "push", "-q", "origin", "main")
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    """
+    A bare "demo/repo" served over file:// (partial clone needs the upload-pack
+    side of the protocol, which plain local paths skip), plus a work tree to push from.
+    """
+    bare = tmp_path / "remote" / "demo" / "repo.git"
+    subprocess.run(["git", "init", "-q", "--bare", "-b", "main", str(bare)], check=True)
+    git(str(bare), "config", "uploadpack.allowFilter", "true")
+    work = str(tmp_path / "work")
+    subprocess.run(["git", "clone", "-q", str(bare), work], check=True, capture_output=True)
+    git(work, "checkout", "-q", "-b", "main")
+    git(work, "config", "user.email", "dev@example.com")
+    git(work, "config", "user.name", "Dev")
+
+    monkeypatch.setattr(git_clone, "GIT_CLONE_URL", f"file://{tmp_path}/remote/{{owner}}/{{repo}}.git")
+    monkeypatch.setattr(git_clone, "GIT_CLONE_DIR", str(tmp_path / "clones"))
+    monkeypatch.setattr(git_clone, "GIT_CLONE_DEPTH", 0)
+
+    async def languages(path, params=None):
+        return {"Python": 100}
+
+    monkeypatch.setattr(git_clone.github_api, "get_json", languages)
+    return work
+
+def fetch():
+    ctx = RepoContext("demo", "repo", {"name": "repo", "default_branch": "main", "size": 1})
+    return asyncio.run(git_clone.fetch_repo_data_from_clone(ctx)), ctx
+
+def test_reads_tree_readme_sources_and_log(remote):
+    commit(remote, {"README.md": b"# Demo\n", "app/main.py": SOURCE, "tests/test_main.py": SOURCE,
+                    "data/big.bin": b"\0" * 200000}, "Initial commit of the demo app")
+    commit(remote, {"app/util.py": SOURCE}, "wip")
+
+    data, ctx = fetch()
+    files = {f.path: f for f in data["files"]}
+    assert data["source"] == "git"
+    assert data["readme"] == "# Demo\n"
+    assert data["languages"] == {"Python": 100}
+    assert data["commits"] == {"total_count": 2, "messages": ["wip", "Initial commit of the demo app"]}
+    assert files["app"].type == "dir"
+    assert files["app/main.py"].decoded_content == SOURCE
+    assert files["data/big.bin"].decoded_content is None
+
+    # Blobless: only the sources and the README were downloaded
+    path = git_clone.clone_path("demo", "repo")
+    assert files["data/big.bin"].sha not in git_clone._local_blobs(path)
+    assert len(git_clone._local_blobs(path)) == 2  # README + one shared source blob
+
+    code = analyze_code(data, ctx)
+    assert code["has_tests"] and code["has_readme"]
+
+def test_resync_fetches_only_new_history(remote):
+    commit(remote, {"README.md": b"# Demo\n", "app/main.py": SOURCE}, "Initial commit of the demo app")
+    fetch()
+    path = git_clone.clone_path("demo", "repo")
+    before = git_clone._local_blobs(path)
+
+    commit(remote, {"app/new.py": SOURCE + b"\ndef g():\n    return 3\n"}, "Add the new module")
+    data, _ = fetch()
+    assert data["commits"]["total_count"] == 2
+    assert data["commits"]["messages"][0] == "Add the new module"
+    assert "app/new.py" in {f.path for f in data["files"]}
+    # Existing blobs were reused, the new one fetched
+    assert len(git_clone._local_blobs(path) - before) == 1
+
+def test_shallow_clone_takes_the_commit_total_from_the_api(remote, monkeypatch):
+    for i in range(5):
+        commit(remote, {"app/main.py": SOURCE + f"# {i}\n".encode()}, f"Change number {i} of main")
+    monkeypatch.setattr(git_clone, "GIT_CLONE_DEPTH", 2)
+
+    async def stats(ctx):
+        return {"total_count": 5, "messages": []}
+
+    monkeypatch.setattr(git_clone, "fetch_commit_stats", stats)
+    data, _ = fetch()
+    assert data["commits"]["total_count"] == 5
+    assert data["commits"]["messages"] == ["Change number 4 of main", "Change number 3 of main"]
+
+def test_unreachable_remote_raises(remote, monkeypatch):
+    monkeypatch.setattr(git_clone, "GIT_CLONE_URL", "file:///nonexistent/{owner}/{repo}.git")
+    with pytest.raises(git_clone.GitError):
+        fetch()
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+
+from app import github_api
+from app.cache import TieredCache
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from github_fixture import FixtureServer, synthesize
+
+def test_not_modified_is_answered_from_the_cache(monkeypatch):
+    server = FixtureServer({"small": synthesize("small")}).start()
+    statuses = []
+    respond = server.respond
+
+    def recording_respond(*args):
+        reply = respond(*args)
+        statuses.append(reply[0])
+        return reply
+
+    monkeypatch.setattr(server, "respond", recording_respond)
+    monkeypatch.setattr(github_api, "GITHUB_API_URL", server.url)
+    monkeypatch.setattr(github_api.scheduler, "has_token", lambda: False)
+
+    async def run():
+        first = await github_api.request("/repos/demo/small-304/languages")
+        again = await github_api.request("/repos/demo/small-304/languages")
+        return first, again
+
+    try:
+        first, again = asyncio.run(run())
+    finally:
+        server.stop()
+    assert statuses == [200, 304]
+    assert again.status_code == 200
+    assert again.json() == first.json()
+    assert again.headers["etag"] == first.headers["etag"]
+    assert again.headers["content-type"] == "application/json"
+
+def test_memory_tier_is_bounded_by_bytes(tmp_path):
+    cache = TieredCache("weighed_test", ttl=60, memory_items=100, memory_bytes=10,
+                        weigh=len, path=str(tmp_path / "cache.sqlite3"))
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    cache.put("c", "xxxx")
+    # Over 10 bytes: the least recently used entry left memory, not the disk
+    assert cache.peek("a") is None and cache.peek("b") == "xxxx"
+    assert cache.get("a") == "xxxx"
+    # Larger than the whole budget: disk only
+    cache.put("big", "x" * 11)
+    assert cache.peek("big") is None and cache.get("big") == "x" * 11
+    assert cache._memory_size <= 10
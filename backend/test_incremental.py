@@ -0,0 +1,198 @@
+import asyncio
+
+import pytest
+
+from app import code_analyzer, incremental
+from app.github_fetcher import RepoContext, RepoFile, RECENT_COMMITS
+from app.incremental import fetch_repo_data_incremental, describe_changes
+
+CTX = RepoContext("demo", "repo", {"name": "repo", "default_branch": "main", "stargazers_count": 3})
+BASE = "b" * 40
+HEAD = "h" * 40
+
+def state():
+    return {
+        "sha": BASE,
+        "blobs": {
+            "README.md": ["r1", 120],
+            "app/main.py": ["m1", 400],
+            "app/old.py": ["o1", 300],
+            "docs/gone.md": ["g1", 50],
+        },
+        "commits": {"total_count": 12, "messages": [f"Older commit number {i}" for i in range(RECENT_COMMITS)]},
+        "score": 60,
+        "code": {"complexity": 10, "has_tests": False, "has_src_folder": True},
+        "commit_metrics": {"total_commits": 12, "good_commit_ratio": 0.5},
+    }
+
+def compare(**overrides):
+    body = {
+        "status": "ahead",
+        "ahead_by": 2,
+        "commits": [
+            {"commit": {"message": "Move the old module into lib"}},
+            {"commit": {"message": "Add tests for the main module"}},
+        ],
+        "files": [
+            {"filename": "lib/new.py", "previous_filename": "app/old.py", "status": "renamed", "sha": "n1"},
+            {"filename": "docs/gone.md", "status": "removed", "sha": "g1"},
+            {"filename": "app/main.py", "status": "modified", "sha": "m2"},
+            {"filename": "tests/test_main.py", "status": "added", "sha": "t1"},
+        ],
+    }
+    body.update(overrides)
+    return body
+
+@pytest.fixture
+def github(monkeypatch):
+    """
+    Answers the compare, languages, readme and contents calls; records which
+    sources were downloaded.
+    """
+    calls = {"compare": compare(), "fetched": [], "fail": set()}
+
+    async def get_json(path, params=None):
+        if "/compare/" in path:
+            assert path.endswith(f"/compare/{BASE}...{HEAD}")
+            return calls["compare"]
+        return {"Python": 100}
+
+    async def get_raw(path, params=None):
+        name = path.split("/contents/", 1)[1]
+        assert params == {"ref": HEAD}
+        calls["fetched"].append(name)
+        if name in calls["fail"]:
+            raise TimeoutError(name)
+        return f"# {name}\n".encode()
+
+    async def readme(ctx):
+        return "# Demo\n"
+
+    def lookup_metrics(blob_shas):
+        # Only the unchanged blobs were scored before
+        return {path: {"complexity": 1} for path, sha in blob_shas.items() if sha in ("m1", "o1")}
+
+    monkeypatch.setattr(incremental.github_api, "get_json", get_json)
+    monkeypatch.setattr(incremental.github_api, "get_raw", get_raw)
+    monkeypatch.setattr(incremental, "fetch_readme", readme)
+    monkeypatch.setattr(incremental, "lookup_metrics", lookup_metrics)
+    return calls
+
+def fetch():
+    return asyncio.run(fetch_repo_data_incremental(CTX, HEAD, state()))
+
+def test_patches_the_tree_from_the_compare_diff(github):
+    data = fetch()
+    files = {f.path: f for f in data["files"]}
+
+    # Renamed and removed files are gone, their now-empty directory too
+    assert "app/old.py" not in files and "docs/gone.md" not in files and "docs" not in files
+    assert {path for path, f in files.items() if f.type == "dir"} == {"app", "lib", "tests"}
+    assert files["lib/new.py"].sha == "n1"
+    assert files["app/main.py"].sha == "m2"
+    assert files["README.md"].sha == "r1" and files["README.md"].size == 120
+
+    # Only the changed Python sources were downloaded, and got their sizes
+    assert sorted(github["fetched"]) == ["app/main.py", "lib/new.py", "tests/test_main.py"]
+    assert files["tests/test_main.py"].decoded_content == b"# tests/test_main.py\n"
+    assert files["tests/test_main.py"].size == len(b"# tests/test_main.py\n")
+
+    assert data["readme"] == "# Demo\n"
+    assert data["languages"] == {"Python": 100}
+    assert data["incremental_base"] == BASE
+    assert data["degraded"] == []
+
+def test_merges_commit_count_and_messages(github):
+    commits = fetch()["commits"]
+    assert commits["total_count"] == 14
+    # Newest first, then the stored ones, capped at RECENT_COMMITS
+    assert commits["messages"][:3] == ["Add tests for the main module", "Move the old module into lib", "Older commit number 0"]
+    assert len(commits["messages"]) == RECENT_COMMITS
+
+def test_identical_head_reuses_the_state(github):
+    github["compare"] = compare(status="identical", ahead_by=0, commits=[], files=[])
+    data = fetch()
+    assert github["fetched"] == []
+    assert data["commits"]["total_count"] == 12
+    assert {f.path for f in data["files"] if f.type == "file"} == set(state()["blobs"])
+
+@pytest.mark.parametrize("overrides", [
+    # Force-push: the old head is no longer an ancestor
+    {"status": "diverged"},
+    {"status": "behind"},
+    # The compare API stops listing files at 300
+    {"files": [{"filename": f"f{i}.md", "status": "added", "sha": "x"} for i in range(incremental.COMPARE_MAX_FILES)]},
+    # ...and commits at 250
+    {"ahead_by": 400},
+])
+def test_untrustworthy_diffs_fall_back_to_a_full_fetch(github, overrides):
+    github["compare"] = compare(**overrides)
+    assert fetch() is None
+
+def test_too_many_sources_to_fetch_falls_back(github, monkeypatch):
+    monkeypatch.setattr(incremental, "INCREMENTAL_MAX_FETCHES", 2)
+    assert fetch() is None
+    assert github["fetched"] == []
+
+def test_a_failed_source_download_falls_back(github):
+    github["fail"].add("lib/new.py")
+    assert fetch() is None
+
+def test_describe_changes():
+    files = [
+        RepoFile("app", "app", "dir"),
+        RepoFile("README.md", "README.md", sha="r1"),
+        RepoFile("app/main.py", "main.py", sha="m2"),
+        RepoFile("lib/new.py", "new.py", sha="n1"),
+    ]
+    result = {
+        "score": 72,
+        "details": {
+            "code": {"complexity": 14, "has_tests": True, "has_src_folder": True},
+            "commits": {"total_commits": 14, "good_commit_ratio": 0.6},
+        },
+    }
+    changes = describe_changes(state(), {"files": files, "incremental_base": BASE}, result)
+    assert changes == {
+        "since_sha": BASE,
+        "mode": "incremental",
+        "new_commits": 2,
+        "files_added": ["lib/new.py"],
+        "files_modified": ["app/main.py"],
+        "files_removed": ["app/old.py", "docs/gone.md"],
+        "score_delta": 12,
+        "complexity_delta": 4,
+        "good_commit_ratio_delta": 0.1,
+        "has_tests": {"before": False, "after": True},
+        "has_src_folder": {"before": True, "after": True},
+    }
+    assert describe_changes(state(), {"files": files}, result)["mode"] == "full"
+
+def test_large_repos_stream_only_what_the_diff_did_not_fetch(github, monkeypatch):
+    big = RepoContext("demo", "repo", {**CTX.info, "size": 10 ** 9})
+    assert big.stream_archive
+    previous = state()
+    previous["blobs"]["app/util.py"] = ["u1", 200]
+    # Unchanged and scored before, so the incremental fetch skips it...
+    monkeypatch.setattr(incremental, "lookup_metrics", lambda blob_shas: {"app/util.py": {"complexity": 1}})
+    data = asyncio.run(fetch_repo_data_incremental(big, HEAD, previous))
+    assert "app/util.py" not in github["fetched"]
+
+    streamed = []
+
+    def streamed_metrics(ctx, wanted, blob_shas):
+        streamed.extend(wanted)
+        return {path: {"complexity": 5} for path in wanted}
+
+    # ...but its cached result has expired by the time the code is analyzed
+    monkeypatch.setattr(code_analyzer, "lookup_metrics", lambda blob_shas: {})
+    monkeypatch.setattr(code_analyzer, "_streamed_metrics", streamed_metrics)
+    code = code_analyzer.analyze_code(data, big)
+    # The downloaded sources are scored inline, only the rest comes from the archive
+    assert streamed == ["app/util.py"]
+    inline = code_analyzer.compute_complexity(
+        {f.path: f.decoded_content.decode() for f in data["files"] if f.decoded_content}, {}
+    )
+    assert set(inline) == {"app/main.py", "lib/new.py", "tests/test_main.py"}
+    assert code["complexity"] == 5 + sum(m["complexity"] for m in inline.values())
+    assert data["degraded"] == []
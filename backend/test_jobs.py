@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+import pytest
+
+from app import jobs
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    queue = jobs.JobQueue(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs, "queue", queue)
+    monkeypatch.setattr(jobs, "JOB_WORKERS", 2)
+    monkeypatch.setattr(jobs, "_handlers", {})
+    return queue
+
+def test_jobs_run_on_a_bounded_pool_and_claim_off_the_loop(queue, monkeypatch):
+    running = {"now": 0, "max": 0}
+    claim_threads = []
+    claim = queue.claim
+
+    def recording_claim():
+        claim_threads.append(threading.get_ident())
+        return claim()
+
+    monkeypatch.setattr(queue, "claim", recording_claim)
+
+    async def double(payload):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.02)
+        running["now"] -= 1
+        if payload["n"] < 0:
+            raise ValueError("negative")
+        return payload["n"] * 2
+
+    jobs.register("double", double)
+
+    async def run():
+        jobs.start_workers()
+        ids = [await jobs.submit("double", {"n": n}) for n in (1, 2, 3, 4, 5, -1)]
+        while any(queue.get(i)["status"] in (jobs.QUEUED, jobs.RUNNING) for i in ids):
+            await asyncio.sleep(0.01)
+        await jobs.stop_workers()
+        return ids, threading.get_ident()
+
+    ids, loop_thread = asyncio.run(run())
+    finished = [queue.get(i) for i in ids]
+    assert [job["result"] for job in finished[:5]] == [2, 4, 6, 8, 10]
+    assert finished[5]["status"] == jobs.FAILED and finished[5]["error"] == "negative"
+    assert running["max"] == 2
+    assert claim_threads and loop_thread not in claim_threads
+
+def test_unknown_job_types_are_rejected(queue):
+    with pytest.raises(ValueError):
+        asyncio.run(jobs.submit("nope", {}))
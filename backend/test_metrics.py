@@ -0,0 +1,61 @@
+from fastapi.testclient import TestClient
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app import main, metrics
+from app.cache import TieredCache
+
+def test_exposition_format(monkeypatch):
+    # A registry of its own, so these don't show up on /metrics
+    monkeypatch.setattr(metrics, "_metrics", {})
+    requests = metrics.counter("test_requests_total", "Requests.", ("path",))
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    latency = metrics.histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1))
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = metrics.render()
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{path="/a\\"b"} 3' in text
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "test_latency_seconds_sum 5.55" in text
+    assert "test_latency_seconds_count 3" in text
+
+def test_cache_lookups_are_counted():
+    cache = TieredCache("metrics_test", ttl=60)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.get_many(["a", "b", "c"])
+    assert metrics.cache_lookups.value("metrics_test", "hit") == 2
+    assert metrics.cache_lookups.value("metrics_test", "miss") == 3
+
+def test_fallback_stages_and_server_timing():
+    fallbacks = metrics.analyses.value("fetch_fallback")
+    parses = metrics.stage_seconds.count("parse")
+
+    # The app as SERVER_TIMING=1 wraps it
+    client = TestClient(BaseHTTPMiddleware(main.app, dispatch=main.server_timing_middleware))
+    # GITHUB_API_URL points nowhere in the tests (conftest.py): the fetch fails
+    # and the mock engine answers
+    response = client.post("/api/analyze", json={"url": "not-a-url"})
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("parse;dur=")
+    assert "total;dur=" in timing
+    assert metrics.analyses.value("fetch_fallback") == fallbacks + 1
+    assert metrics.stage_seconds.count("parse") == parses + 1
+
+    scrape = client.get("/api/metrics")
+    assert scrape.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'gitgrade_analyses_total{outcome="fetch_fallback"}' in scrape.text
+
+def test_server_timing_is_opt_in():
+    assert not metrics.SERVER_TIMING
+    assert all(m.kwargs.get("dispatch") is not main.server_timing_middleware for m in main.app.user_middleware)
+    response = TestClient(main.app).get("/api/metrics")
+    assert "Server-Timing" not in response.headers
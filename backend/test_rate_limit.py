@@ -0,0 +1,109 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from app import github_api, rate_limit
+
+# token -> {"remaining", "reset"} served back in X-RateLimit-* headers
+BUDGETS = {}
+# token -> number of 403 rate-limit answers still to send
+LIMITED = {}
+CALLS = []
+
+class FakeGitHub(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        token = self.headers.get("Authorization", "").replace("Bearer ", "")
+        CALLS.append(token)
+        budget = BUDGETS.setdefault(token, {"remaining": 5000, "reset": int(time.time()) + 3600})
+        if LIMITED.get(token):
+            LIMITED[token] -= 1
+            budget["remaining"] = 0
+            code, body = 403, {"message": "API rate limit exceeded"}
+        else:
+            budget["remaining"] = max(0, budget["remaining"] - 1)
+            code, body = 200, {"name": "r"}
+        raw = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.send_header("X-RateLimit-Limit", "5000")
+        self.send_header("X-RateLimit-Remaining", str(budget["remaining"]))
+        self.send_header("X-RateLimit-Reset", str(budget["reset"]))
+        self.send_header("X-RateLimit-Resource", "core")
+        self.end_headers()
+        self.wfile.write(raw)
+
+def setup_function():
+    BUDGETS.clear()
+    LIMITED.clear()
+    CALLS.clear()
+
+def start_server(monkeypatch, tokens):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(github_api, "GITHUB_API_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setenv("GITHUB_TOKENS", tokens)
+    scheduler = rate_limit.TokenScheduler()
+    monkeypatch.setattr(github_api, "scheduler", scheduler)
+    return server, scheduler
+
+def fetch(n):
+    async def run():
+        return await asyncio.gather(*[github_api.get_json(f"/repos/o/r{i}") for i in range(n)])
+    return asyncio.run(run())
+
+def test_weighted_round_robin(monkeypatch):
+    server, _ = start_server(monkeypatch, "tok-aaaa:2,tok-bbbb")
+    fetch(9)
+    server.shutdown()
+    assert CALLS.count("tok-aaaa") == 6
+    assert CALLS.count("tok-bbbb") == 3
+
+def test_low_token_is_skipped_and_budget_reported(monkeypatch):
+    server, scheduler = start_server(monkeypatch, "tok-aaaa,tok-bbbb")
+    BUDGETS["tok-aaaa"] = {"remaining": 3, "reset": int(time.time()) + 3600}
+    fetch(1)
+    CALLS.clear()
+    fetch(6)
+    server.shutdown()
+    # Whichever token took the first call, nothing more goes to the exhausted one
+    assert CALLS.count("tok-aaaa") == 0
+
+    status = {s["token"]: s for s in scheduler.status()}
+    assert set(status) == {"...aaaa", "...bbbb"}
+    assert status["...bbbb"]["budgets"]["core"]["remaining"] == BUDGETS["tok-bbbb"]["remaining"]
+    assert "tok-aaaa" not in json.dumps(scheduler.status())
+
+def test_queues_until_reset_instead_of_failing(monkeypatch):
+    server, _ = start_server(monkeypatch, "tok-aaaa")
+    monkeypatch.setattr(rate_limit, "GITHUB_RATE_LIMIT_POLL", 0.05)
+    BUDGETS["tok-aaaa"] = {"remaining": 1, "reset": int(time.time()) + 1}
+    fetch(1)
+    started = time.time()
+    assert fetch(1) == [{"name": "r"}]
+    server.shutdown()
+    assert time.time() - started >= 0.1
+
+def test_gives_up_when_reset_is_too_far(monkeypatch):
+    server, _ = start_server(monkeypatch, "tok-aaaa")
+    BUDGETS["tok-aaaa"] = {"remaining": 1, "reset": int(time.time()) + 3600}
+    fetch(1)
+    try:
+        fetch(1)
+        assert False, "expected RateLimitExhausted"
+    except rate_limit.RateLimitExhausted:
+        pass
+    server.shutdown()
+
+def test_rate_limited_call_moves_to_another_token(monkeypatch):
+    server, _ = start_server(monkeypatch, "tok-aaaa,tok-bbbb")
+    LIMITED["tok-aaaa"] = 1
+    assert fetch(2) == [{"name": "r"}, {"name": "r"}]
+    server.shutdown()
+    assert CALLS.count("tok-aaaa") == 1
+    assert CALLS.count("tok-bbbb") == 2
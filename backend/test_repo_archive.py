@@ -0,0 +1,75 @@
+import io
+import random
+import tarfile
+
+from app import repo_archive
+from app.repo_archive import ChunkReader, is_analyzable, iter_sources, read_sources
+
+def tarball(files: dict) -> bytes:
+    # Laid out like a GitHub archive: one "<owner>-<repo>-<sha>/" root
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        tar.addfile(tarfile.TarInfo("demo-repo-abc1234/"), None)
+        for path, content in files.items():
+            member = tarfile.TarInfo(f"demo-repo-abc1234/{path}")
+            member.size = len(content)
+            tar.addfile(member, io.BytesIO(content))
+    return buffer.getvalue()
+
+def chunked(data: bytes, size: int = 7):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+def test_is_analyzable():
+    assert is_analyzable("app/main.py", 100)
+    assert not is_analyzable("app/main.js", 100)
+    assert not is_analyzable("node_modules/pkg/setup.py", 100)
+    assert not is_analyzable("src/.venv/lib/site.py", 100)
+    # Only directories count as vendored, not file names
+    assert is_analyzable("app/vendor.py", 100)
+    assert not is_analyzable("app/main.py", repo_archive.ARCHIVE_MAX_FILE_BYTES + 1)
+
+def test_streams_sources_from_a_chunk_iterator():
+    archive = tarball({
+        "app/main.py": b"def main():\n    return 1\n",
+        "README.md": b"# Demo\n",
+        "vendor/lib/dep.py": b"x = 1\n",
+        "build/generated.py": b"y = 2\n",
+        "tests/test_main.py": b"def test():\n    pass\n",
+    })
+    sources = dict(iter_sources(ChunkReader(chunked(archive))))
+    assert sources == {
+        "app/main.py": b"def main():\n    return 1\n",
+        "tests/test_main.py": b"def test():\n    pass\n",
+    }
+
+def test_sources_are_yielded_as_their_member_arrives():
+    # Incompressible, so the skipped member spans many chunks of the download
+    archive = tarball({"a.py": b"a = 1\n", "big.bin": random.Random(0).randbytes(200_000), "b.py": b"b = 2\n"})
+    chunks = list(chunked(archive, 4096))
+    read = []
+
+    def counting():
+        for chunk in chunks:
+            read.append(chunk)
+            yield chunk
+
+    sources = iter_sources(ChunkReader(counting()))
+    assert next(sources) == ("a.py", b"a = 1\n")
+    # The rest of the download hasn't been pulled yet
+    assert len(read) < len(chunks) // 2
+    assert list(sources) == [("b.py", b"b = 2\n")]
+
+def test_wanted_restricts_the_paths():
+    archive = tarball({"a.py": b"a = 1\n", "b.py": b"b = 2\n"})
+    assert read_sources(archive, {"b.py", "missing.py"}) == {"b.py": b"b = 2\n"}
+
+def test_per_file_cap(monkeypatch):
+    monkeypatch.setattr(repo_archive, "ARCHIVE_MAX_FILE_BYTES", 10)
+    archive = tarball({"small.py": b"x = 1\n", "large.py": b"x = 1\n" * 10})
+    assert dict(iter_sources(ChunkReader(chunked(archive)))) == {"small.py": b"x = 1\n"}
+
+def test_total_cap_stops_reading(monkeypatch):
+    monkeypatch.setattr(repo_archive, "ARCHIVE_MAX_TOTAL_BYTES", 15)
+    archive = tarball({"a.py": b"a = 1\n", "b.py": b"b = 2\n", "c.py": b"c = 3\n", "d.py": b"d\n"})
+    # a and b fit (12 bytes), c would pass the budget: nothing after it is read
+    assert [path for path, _ in iter_sources(ChunkReader(chunked(archive)))] == ["a.py", "b.py"]
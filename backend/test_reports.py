@@ -0,0 +1,57 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app import main, reports
+from app.fallback_scorer import fallback_result
+from app.reports import store_result
+
+client = TestClient(main.app)
+
+def test_report_names_outside_latin_1_are_encoded():
+    result = asyncio.run(store_result(fallback_result("https://github.com/someone/café-app")))
+    response = client.get(f"/api/reports/{result['analysis_id']}/pdf")
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert response.headers["content-disposition"] == (
+        "attachment; filename=\"caf_-app_GitGrade_Report.pdf\"; filename*=utf-8''caf%C3%A9-app_GitGrade_Report.pdf"
+    )
+
+def test_quotes_cannot_break_out_of_the_filename():
+    result = asyncio.run(store_result({**fallback_result("https://github.com/demo/repo"), "repo_name": 'a"b'}))
+    response = client.get(f"/api/reports/{result['analysis_id']}/pdf")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == (
+        "attachment; filename=\"a_b_GitGrade_Report.pdf\"; filename*=utf-8''a%22b_GitGrade_Report.pdf"
+    )
+
+def test_plain_names_are_unchanged():
+    assert main.content_disposition("repo_GitGrade_Report.pdf") == 'attachment; filename="repo_GitGrade_Report.pdf"'
+
+def test_legacy_download_keeps_utf8_filenames():
+    # What older clients got from FileResponse, plus an ASCII fallback
+    response = client.get("/api/download-pdf", params={"repo": "démo-ü", "score": 70, "summary": "ok", "roadmap": "a,b"})
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert "filename*=utf-8''d%C3%A9mo-%C3%BC_GitGrade_Report.pdf" in response.headers["content-disposition"]
+
+def test_fallback_answers_even_when_the_report_cannot_be_stored(monkeypatch):
+    async def unreachable(url):
+        raise ConnectionError("GitHub is down")
+
+    async def broken_store(result):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(main, "result_cache_key", unreachable)
+    monkeypatch.setattr(main, "store_result", broken_store)
+    response = client.post("/api/analyze", json={"url": "https://github.com/demo/offline"})
+    assert response.status_code == 200
+    assert response.json() == fallback_result("https://github.com/demo/offline", main.FETCH_FAILED)
+
+def test_storing_the_same_result_again_skips_the_disk(monkeypatch):
+    result = fallback_result("https://github.com/demo/again")
+    first = asyncio.run(store_result(result))
+    writes = []
+    monkeypatch.setattr(reports._results, "_write", lambda items, now: writes.append(items))
+    assert asyncio.run(store_result(result)) == first
+    assert writes == []
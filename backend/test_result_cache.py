@@ -0,0 +1,100 @@
+import asyncio
+
+from app import code_analyzer, github_fetcher, main
+from app.github_fetcher import RepoContext, RepoFile
+from app.incremental import load_state
+
+CTX = RepoContext("demo", "repo", {"name": "repo", "default_branch": "main"})
+
+def repo_data(**overrides):
+    data = {
+        "name": "repo",
+        "languages": {"Python": 100},
+        "files": [RepoFile("README.md", "README.md", sha="a" * 40)],
+        "readme": "# Demo\n",
+        "commits": {"total_count": 12, "messages": ["Add the scoring engine module"]},
+        "default_branch": "main",
+        "has_api": True,
+        "degraded": [],
+    }
+    data.update(overrides)
+    return data
+
+def stub_pipeline(monkeypatch, sha, data):
+    async def cache_key(url):
+        return f"demo/repo@{sha}"
+
+    async def context(url):
+        return CTX
+
+    async def fetch(ctx):
+        return data
+
+    async def no_delta(ctx, head_sha, previous):
+        return None
+
+    monkeypatch.setattr(main, "result_cache_key", cache_key)
+    monkeypatch.setattr(main, "get_repo_context", context)
+    monkeypatch.setattr(main, "fetch_repo_data", fetch)
+    monkeypatch.setattr(main, "fetch_repo_data_incremental", no_delta)
+
+def test_complete_results_are_cached(monkeypatch):
+    stub_pipeline(monkeypatch, "1" * 40, repo_data())
+    result = asyncio.run(main.run_analysis("https://github.com/demo/repo"))
+    assert main.result_cache.get(f"demo/repo@{'1' * 40}") == result
+    assert asyncio.run(load_state(CTX))["sha"] == "1" * 40
+
+def test_degraded_results_are_answered_but_not_cached(monkeypatch):
+    # The commit-stats call timed out: no commit count, a lower grade
+    stub_pipeline(monkeypatch, "2" * 40, repo_data(commits=None, degraded=["commits"]))
+    result = asyncio.run(main.run_analysis("https://github.com/demo/repo"))
+    assert result["details"]["commits"]["total_commits"] == 0
+    assert main.result_cache.get(f"demo/repo@{'2' * 40}") is None
+    assert (asyncio.run(load_state(CTX)) or {}).get("sha") != "2" * 40
+
+async def tree(ctx):
+    return [], False
+
+def test_fetch_repo_data_flags_failed_calls(monkeypatch):
+    async def ok(*args, **kwargs):
+        return {}
+
+    async def fails(ctx):
+        raise TimeoutError("GitHub call 'commits' timed out")
+
+    monkeypatch.setattr(github_fetcher.github_api, "get_json", ok)
+    monkeypatch.setattr(github_fetcher, "_list_tree", tree)
+    monkeypatch.setattr(github_fetcher, "fetch_readme", ok)
+    monkeypatch.setattr(github_fetcher, "fetch_commit_stats", fails)
+    data = asyncio.run(github_fetcher.fetch_repo_data(CTX))
+    assert data["commits"] is None
+    assert data["degraded"] == ["commits"]
+
+def test_failed_archive_stream_flags_complexity(monkeypatch):
+    def fails(ctx, wanted, blob_shas):
+        raise OSError("connection reset")
+
+    monkeypatch.setattr(code_analyzer, "_streamed_metrics", fails)
+    ctx = RepoContext("demo", "big", {"name": "big", "size": 10 ** 9})
+    data = repo_data(files=[RepoFile("app/main.py", "main.py", size=10, sha="b" * 40)])
+    code_analyzer.analyze_code(data, ctx)
+    assert data["degraded"] == ["complexity"]
+
+def test_truncated_tree_flags_files(monkeypatch):
+    async def get_json(path, params=None):
+        if "/git/trees/" in path:
+            return {"tree": [{"path": "README.md", "type": "blob", "size": 10, "sha": "a" * 40}], "truncated": True}
+        return {}
+
+    async def readme(ctx):
+        return "# Demo\n"
+
+    async def commits(ctx):
+        return {"total_count": 1, "messages": ["Initial commit"]}
+
+    monkeypatch.setattr(github_fetcher.github_api, "get_json", get_json)
+    monkeypatch.setattr(github_fetcher, "fetch_readme", readme)
+    monkeypatch.setattr(github_fetcher, "fetch_commit_stats", commits)
+    data = asyncio.run(github_fetcher.fetch_repo_data(CTX))
+    assert [f.path for f in data["files"]] == ["README.md"]
+    assert data["degraded"] == ["files"]
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from app import ai_summary, llm_client
+
+PROMPTS = []
+DELAY = {"seconds": 0}
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][0]["content"]
+        PROMPTS.append(prompt)
+        time.sleep(DELAY["seconds"])
+        content = f"Narrative #{len(PROMPTS)}"
+        if body.get("response_format"):
+            count = prompt.count("### Repository")
+            content = json.dumps({"summaries": [f"Narrative #{len(PROMPTS)}.{i}" for i in range(1, count + 1)]})
+        raw = json.dumps({
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+REPO = {"name": "r"}
+GOOD_CODE = {"has_src_folder": True, "readme_score": 5, "has_tests": True, "complexity": 3}
+BAD_CODE = {"has_src_folder": False, "readme_score": 0, "has_tests": False, "complexity": 80}
+COMMITS = {"total_commits": 40, "good_commit_ratio": 0.9}
+
+def start_server(monkeypatch):
+    PROMPTS.clear()
+    DELAY["seconds"] = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    ai_summary._summary_cache.clear()
+    return server
+
+def summarize(repo, code, commits):
+    return asyncio.run(ai_summary.generate_summary_async(repo, code, commits))
+
+def test_identical_fact_profiles_reuse_the_narrative(monkeypatch):
+    server = start_server(monkeypatch)
+    first = summarize(REPO, GOOD_CODE, COMMITS)
+    # Different repo, same facts
+    second = asyncio.run(ai_summary.generate_summary_async({"name": "other"}, dict(GOOD_CODE, complexity=4), COMMITS))
+    third = summarize(REPO, BAD_CODE, COMMITS)
+    server.shutdown()
+    assert first == second == "Narrative #1"
+    assert third == "Narrative #2"
+    assert len(PROMPTS) == 2
+
+def test_concurrent_identical_profiles_share_one_completion(monkeypatch):
+    server = start_server(monkeypatch)
+
+    async def run():
+        return await asyncio.gather(*[ai_summary.generate_summary_async(REPO, GOOD_CODE, COMMITS) for _ in range(5)])
+
+    summaries = asyncio.run(run())
+    server.shutdown()
+    assert summaries == ["Narrative #1"] * 5
+    assert len(PROMPTS) == 1
+
+def test_key_covers_model_and_prompt_version(monkeypatch):
+    key = ai_summary.summary_cache_key(["Automated tests detected"], [])
+    assert key == ai_summary.summary_cache_key(["automated tests detected "], [])
+    monkeypatch.setattr(ai_summary, "PROMPT_VERSION", ai_summary.PROMPT_VERSION + 1)
+    assert key != ai_summary.summary_cache_key(["Automated tests detected"], [])
+    monkeypatch.setattr(ai_summary, "SUMMARY_MODEL", "gpt-4o-mini")
+    assert key != ai_summary.summary_cache_key(["Automated tests detected"], [])
+
+def test_failed_completions_are_not_cached(monkeypatch):
+    server = start_server(monkeypatch)
+    server.shutdown()
+    server.server_close()
+    summary = summarize(REPO, GOOD_CODE, COMMITS)
+    assert summary.startswith("The project shows")
+    assert ai_summary._summary_cache.get(ai_summary.summary_cache_key(
+        *[ai_summary.derive_facts(GOOD_CODE, COMMITS, REPO)[k] for k in ("strengths", "weaknesses")]
+    )) is None
+
+def test_distinct_profiles_in_flight_share_one_request(monkeypatch):
+    server = start_server(monkeypatch)
+    profiles = [GOOD_CODE, BAD_CODE, dict(BAD_CODE, has_tests=True)]
+
+    async def run():
+        return await asyncio.gather(*[ai_summary.generate_summary_async(REPO, code, COMMITS) for code in profiles])
+
+    summaries = asyncio.run(run())
+    server.shutdown()
+    assert len(PROMPTS) == 1
+    assert sorted(summaries) == ["Narrative #1.1", "Narrative #1.2", "Narrative #1.3"]
+    # Each narrative is cached under its own profile
+    assert summarize(REPO, BAD_CODE, COMMITS) == summaries[1]
+
+def test_slow_llm_falls_back_to_the_mirror_summary(monkeypatch):
+    server = start_server(monkeypatch)
+    DELAY["seconds"] = 1
+    monkeypatch.setattr(llm_client, "LLM_TIMEOUT", 0.2)
+    started = time.time()
+    summary = asyncio.run(ai_summary.generate_summary_async(REPO, GOOD_CODE, COMMITS))
+    server.shutdown()
+    assert time.time() - started < 1
+    assert summary.startswith("Analysis Results:")
@@ -17,6 +17,7 @@ interface AnalysisData {
     roadmap: string[];
     breakdown?: Record<string, number>;
     verdict?: string;
+    analysis_id?: string;
 }
 
 function ResultPageContent() {
@@ -69,7 +70,10 @@ function ResultPageContent() {
         // Remove trailing slash or /analyze if present
         baseUrl = baseUrl.replace(/\/analyze$/, '').replace(/\/$/, '');
 
-        const url = `${baseUrl}/download-pdf?repo=${data.repo_name}&score=${data.score}&summary=${encodeURIComponent(data.summary)}&roadmap=${encodeURIComponent(roadmapStr)}`;
+        // Reports are rendered server-side from the stored analysis
+        const url = data.analysis_id
+            ? `${baseUrl}/reports/${data.analysis_id}/pdf`
+            : `${baseUrl}/download-pdf?repo=${data.repo_name}&score=${data.score}&summary=${encodeURIComponent(data.summary)}&roadmap=${encodeURIComponent(roadmapStr)}`;
         window.open(url, '_blank');
     };
 